@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
-    CourseCategory, Course, Lesson, LessonResource, UserProgress, UserNote,
-    AIConfig, ChatHistory
+    CourseCategory, Course, Lesson, LessonResource, UserProgress, CourseProgress, UserNote,
+    LikeRecord, AIConfig, ChatHistory, ChatSession
 )
 
 
@@ -46,6 +46,14 @@ class UserProgressAdmin(admin.ModelAdmin):
     readonly_fields = ['last_accessed']
 
 
+@admin.register(CourseProgress)
+class CourseProgressAdmin(admin.ModelAdmin):
+    list_display = ['user', 'course', 'completed_count', 'total_study_time', 'updated_at']
+    search_fields = ['user__username', 'course__title']
+    raw_id_fields = ['last_lesson']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(UserNote)
 class UserNoteAdmin(admin.ModelAdmin):
     list_display = ['user', 'lesson', 'is_public', 'like_count', 'created_at']
@@ -53,6 +61,13 @@ class UserNoteAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'content']
 
 
+@admin.register(LikeRecord)
+class LikeRecordAdmin(admin.ModelAdmin):
+    list_display = ['user', 'target', 'object_id', 'created_at']
+    list_filter = ['target']
+    search_fields = ['user__username']
+
+
 @admin.register(AIConfig)
 class AIConfigAdmin(admin.ModelAdmin):
     list_display = ['user', 'provider', 'model_name', 'is_active', 'created_at']
@@ -66,3 +81,10 @@ class ChatHistoryAdmin(admin.ModelAdmin):
     list_filter = ['role']
     search_fields = ['user__username', 'session_id', 'content']
     readonly_fields = ['created_at']
+
+
+@admin.register(ChatSession)
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'session_id', 'summarized_until', 'updated_at']
+    search_fields = ['user__username', 'session_id']
+    readonly_fields = ['updated_at']
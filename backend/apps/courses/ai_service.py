@@ -1,118 +1,192 @@
 """
 AI服务集成
 支持Ollama本地/远程、DeepSeek、OpenAI等多种AI服务
+请求通过 http_client 的连接池发送, 同一服务地址复用长连接
+chat 返回完整回复; stream_chat 逐段返回模型生成的文字(Ollama 为逐行 JSON, OpenAI 兼容接口为 SSE)
+achat/astream_chat 是对应的异步版本, 供 async_views 使用
 """
+import httpx
 import requests
 import json
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from . import http_client
 
 
 class AIService:
-    """AI服务基类"""
+    """
+    AI服务基类
+    子类提供请求地址、请求体和响应解析, 同步和异步的调用流程都在这里
+    """
+    name = 'AI'
     
     def __init__(self, config):
         self.config = config
     
-    def chat(self, messages: List[Dict], **kwargs) -> str:
-        """发送聊天消息"""
+    def _url(self) -> str:
+        raise NotImplementedError
+    
+    def _headers(self) -> Dict:
+        return {}
+    
+    def _payload(self, messages: List[Dict], stream: bool) -> Dict:
+        raise NotImplementedError
+    
+    def _content(self, data: Dict) -> str:
+        """从完整响应中取出回复内容"""
         raise NotImplementedError
-
-
-class OllamaService(AIService):
-    """Ollama服务"""
+    
+    def _delta(self, line: str) -> Tuple[Optional[str], bool]:
+        """解析流式响应的一行, 返回 (这一段的内容, 是否已结束)"""
+        raise NotImplementedError
+    
+    def _error(self, exc: Exception) -> Exception:
+        return Exception(f"{self.name} API调用失败: {str(exc)}")
     
     def chat(self, messages: List[Dict], **kwargs) -> str:
         """
-        调用Ollama API
+        发送聊天消息
         :param messages: 消息列表 [{'role': 'user', 'content': '...'}]
         :return: AI响应内容
         """
-        url = f"{self.config.api_endpoint}/api/chat"
+        try:
+            response = http_client.post(
+                self._url(), headers=self._headers(), json=self._payload(messages, stream=False)
+            )
+            response.raise_for_status()
+            return self._content(response.json())
         
-        payload = {
+        except requests.RequestException as e:
+            raise self._error(e)
+    
+    def stream_chat(self, messages: List[Dict], **kwargs) -> Iterator[str]:
+        """发送聊天消息, 逐段返回回复内容"""
+        try:
+            with http_client.post(self._url(), headers=self._headers(), json=self._payload(messages, stream=True),
+                                  stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    content, done = self._delta(line.decode('utf-8'))
+                    if content:
+                        yield content
+                    if done:
+                        break
+        
+        except (requests.RequestException, ValueError) as e:
+            raise self._error(e)
+    
+    async def achat(self, messages: List[Dict], **kwargs) -> str:
+        """chat 的异步版本"""
+        try:
+            response = await http_client.apost(
+                self._url(), headers=self._headers(), json=self._payload(messages, stream=False)
+            )
+            response.raise_for_status()
+            return self._content(response.json())
+        
+        except httpx.HTTPError as e:
+            raise self._error(e)
+    
+    async def astream_chat(self, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        """stream_chat 的异步版本"""
+        try:
+            async with http_client.astream('POST', self._url(), headers=self._headers(),
+                                           json=self._payload(messages, stream=True)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    content, done = self._delta(line)
+                    if content:
+                        yield content
+                    if done:
+                        break
+        
+        except (httpx.HTTPError, ValueError) as e:
+            raise self._error(e)
+
+
+class OllamaService(AIService):
+    """Ollama服务"""
+    name = 'Ollama'
+    
+    def _url(self) -> str:
+        return f"{self.config.api_endpoint}/api/chat"
+    
+    def _payload(self, messages: List[Dict], stream: bool) -> Dict:
+        return {
             "model": self.config.model_name,
             "messages": messages,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": self.config.temperature,
                 "num_predict": self.config.max_tokens,
             }
         }
-        
-        try:
-            response = requests.post(url, json=payload, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            return data.get('message', {}).get('content', '')
-        
-        except requests.RequestException as e:
-            raise Exception(f"Ollama API调用失败: {str(e)}")
+    
+    def _content(self, data: Dict) -> str:
+        return data.get('message', {}).get('content', '')
+    
+    def _delta(self, line: str) -> Tuple[Optional[str], bool]:
+        """stream=True 时每行是一个 JSON 对象, done 为 true 时结束"""
+        if not line:
+            return None, False
+        data = json.loads(line)
+        if data.get('error'):
+            raise Exception(f"Ollama API调用失败: {data['error']}")
+        return data.get('message', {}).get('content'), bool(data.get('done'))
 
 
-class DeepSeekService(AIService):
-    """DeepSeek服务"""
+class OpenAICompatibleService(AIService):
+    """OpenAI 兼容的 chat/completions 接口"""
+    name = 'OpenAI'
+    default_endpoint = 'https://api.openai.com'
+    default_model = 'gpt-3.5-turbo'
     
-    def chat(self, messages: List[Dict], **kwargs) -> str:
-        """
-        调用DeepSeek API
-        :param messages: 消息列表
-        :return: AI响应内容
-        """
-        url = "https://api.deepseek.com/v1/chat/completions"
-        
-        headers = {
+    def _url(self) -> str:
+        return f"{self.config.api_endpoint or self.default_endpoint}/v1/chat/completions"
+    
+    def _headers(self) -> Dict:
+        return {
             "Authorization": f"Bearer {self.config.api_key}",
             "Content-Type": "application/json"
         }
-        
+    
+    def _payload(self, messages: List[Dict], stream: bool) -> Dict:
         payload = {
-            "model": self.config.model_name or "deepseek-chat",
+            "model": self.config.model_name or self.default_model,
             "messages": messages,
             "temperature": self.config.temperature,
             "max_tokens": self.config.max_tokens,
         }
-        
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            return data['choices'][0]['message']['content']
-        
-        except requests.RequestException as e:
-            raise Exception(f"DeepSeek API调用失败: {str(e)}")
+        if stream:
+            payload["stream"] = True
+        return payload
+    
+    def _content(self, data: Dict) -> str:
+        return data['choices'][0]['message']['content']
+    
+    def _delta(self, line: str) -> Tuple[Optional[str], bool]:
+        """stream=true 时响应为 SSE, 以 data: [DONE] 结束"""
+        if not line.startswith('data:'):
+            return None, False
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return None, True
+        choices = json.loads(data).get('choices') or [{}]
+        return (choices[0].get('delta') or {}).get('content'), False
 
 
-class OpenAIService(AIService):
-    """OpenAI服务"""
+class DeepSeekService(OpenAICompatibleService):
+    """DeepSeek服务"""
+    name = 'DeepSeek'
+    default_model = 'deepseek-chat'
     
-    def chat(self, messages: List[Dict], **kwargs) -> str:
-        """
-        调用OpenAI API
-        :param messages: 消息列表
-        :return: AI响应内容
-        """
-        url = f"{self.config.api_endpoint or 'https://api.openai.com'}/v1/chat/completions"
-        
-        headers = {
-            "Authorization": f"Bearer {self.config.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": self.config.model_name or "gpt-3.5-turbo",
-            "messages": messages,
-            "temperature": self.config.temperature,
-            "max_tokens": self.config.max_tokens,
-        }
-        
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            return data['choices'][0]['message']['content']
-        
-        except requests.RequestException as e:
-            raise Exception(f"OpenAI API调用失败: {str(e)}")
+    def _url(self) -> str:
+        return "https://api.deepseek.com/v1/chat/completions"
+
+
+class OpenAIService(OpenAICompatibleService):
+    """OpenAI服务"""
+    name = 'OpenAI'
 
 
 class AIServiceFactory:
@@ -137,3 +211,25 @@ class AIServiceFactory:
             raise ValueError(f"不支持的AI服务提供商: {config.provider}")
         
         return service_class(config)
+
+
+def normalize_models(data: Dict) -> List[Dict]:
+    """把 Ollama /api/tags 的响应整理成模型列表"""
+    models = data.get('models') or data.get('data') or []
+
+    normalized = []
+    for item in models:
+        if isinstance(item, str):
+            normalized.append({'name': item, 'display_name': item})
+            continue
+
+        name = item.get('name') or item.get('model') or item.get('id')
+        if not name:
+            continue
+
+        normalized.append({
+            'name': name,
+            'display_name': item.get('display_name') or name,
+            'size': item.get('size') or item.get('size_blobs') or item.get('details', {}).get('parameter_size')
+        })
+    return normalized
@@ -0,0 +1,154 @@
+"""
+课程资源文件清单
+把 /course-res/ 下的每个资源映射到带内容哈希的 URL,
+例如 Day01-20/res/day01/a.png -> /course-res/Day01-20/res/day01/a.3f2a1b9c0d4e.png
+带哈希的 URL 内容不会变化, 可以用 immutable 长期缓存;
+生成清单时在衍生文件目录下按带哈希的文件名复制一份, nginx 按 URL 直接提供, 找不到时才交给后端
+"""
+import json
+import os
+import re
+import shutil
+from pathlib import Path, PurePosixPath
+from urllib.parse import quote
+
+from django.conf import settings
+
+from .images import COURSE_FOLDERS, file_digest
+
+
+
+ASSET_MANIFEST_NAME = 'assets.json'
+# 带哈希文件名的资源副本所在目录(相对衍生文件目录), 与 URL 前缀同名, nginx 可以直接用 root 查找
+ASSET_COPIES_DIR = 'course-res'
+HASH_LENGTH = 12
+
+# 哈希位于扩展名之前: name.<12位十六进制>.ext
+_HASHED_RE = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % HASH_LENGTH)
+_ASSET_URL_RE = re.compile(r'(?P<prefix>%s)(?P<path>[^"\')\s]+)' % re.escape(settings.COURSE_RESOURCES_URL))
+
+# 清单缓存: (mtime, 数据)
+_manifest_cache = {'mtime': None, 'data': {}}
+
+
+def asset_manifest_path():
+    return Path(settings.COURSE_DERIVATIVES_ROOT) / ASSET_MANIFEST_NAME
+
+
+def load_asset_manifest():
+    """读取资源清单(按文件修改时间缓存)"""
+    path = asset_manifest_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    if _manifest_cache['mtime'] != mtime:
+        with open(path, 'r', encoding='utf-8') as f:
+            _manifest_cache['data'] = json.load(f)
+        _manifest_cache['mtime'] = mtime
+    return _manifest_cache['data']
+
+
+def save_asset_manifest(manifest):
+    """原子写入清单"""
+    path = asset_manifest_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def asset_copies_root():
+    return Path(settings.COURSE_DERIVATIVES_ROOT) / ASSET_COPIES_DIR
+
+
+def sync_asset_copies(base_dir, manifest):
+    """
+    按清单生成带哈希文件名的资源副本(已存在的跳过), 删除清单之外的旧副本
+    :return: (新复制的数量, 删除的数量)
+    """
+    root = asset_copies_root()
+    expected = set()
+    copied = 0
+    for rel_path, entry in manifest.items():
+        name = hashed_name(rel_path, entry['digest'])
+        expected.add(name)
+        target = root / name
+        if target.exists():
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f'{target.name}.tmp')
+        shutil.copyfile(base_dir / rel_path, tmp_path)
+        # 计算哈希之后文件可能又被修改, 内容与哈希不一致的副本不能发布
+        if file_digest(tmp_path) != entry['digest']:
+            tmp_path.unlink()
+            continue
+        os.replace(tmp_path, target)
+        copied += 1
+
+    removed = 0
+    if root.exists():
+        for path in root.rglob('*'):
+            if path.is_file() and path.relative_to(root).as_posix() not in expected:
+                path.unlink()
+                removed += 1
+    return copied, removed
+
+
+def is_course_resource(rel_path):
+    """路径是否位于某个课程目录的 res 文件夹下(只有这些文件可以通过 /course-res/ 访问)"""
+    parts = PurePosixPath(rel_path).parts
+    if '..' in parts or len(parts) < 3:
+        return False
+    return parts[0] in COURSE_FOLDERS and 'res' in parts[1:-1]
+
+
+def hashed_name(rel_path, digest):
+    """Day01-20/res/a.png -> Day01-20/res/a.<digest>.png"""
+    path = Path(rel_path)
+    return path.with_name(f'{path.stem}.{digest}{path.suffix}').as_posix()
+
+
+def split_hashed_name(rel_path):
+    """
+    拆出带哈希路径中的原始路径和哈希
+    :return: (原始路径, 哈希), 不带哈希时哈希为 None
+    """
+    match = _HASHED_RE.match(rel_path)
+    if not match:
+        return rel_path, None
+    return f"{match.group('stem')}{match.group('ext')}", match.group('digest')
+
+
+def asset_url(rel_path, manifest=None):
+    """资源的带哈希 URL(不在清单中时返回原始 URL)"""
+    if manifest is None:
+        manifest = load_asset_manifest()
+    entry = manifest.get(rel_path)
+    name = hashed_name(rel_path, entry['digest']) if entry else rel_path
+    return f'{settings.COURSE_RESOURCES_URL}{name}'
+
+
+def rewrite_asset_urls(content, manifest=None):
+    """把内容中的 /course-res/ 链接替换为带哈希的 URL(已带旧哈希的链接换成当前的哈希)"""
+    if manifest is None:
+        manifest = load_asset_manifest()
+    if not manifest:
+        return content
+
+    def replace(match):
+        path = match.group('path')
+        if path not in manifest:
+            path = split_hashed_name(path)[0]
+        if path not in manifest:
+            return match.group(0)
+        return asset_url(path, manifest)
+
+    return _ASSET_URL_RE.sub(replace, content)
+
+
+def accel_redirect_path(rel_path):
+    """交给 nginx 内部 location 的路径"""
+    return f'{settings.COURSE_RESOURCES_ACCEL_PREFIX}{quote(rel_path)}'
+
@@ -0,0 +1,260 @@
+"""
+AI对话和AI配置测试的异步视图
+等待模型服务响应时只占用一个协程, 不会占住整个 worker 或线程; 部署时由单独的 ASGI 进程
+(gunicorn config.asgi -k uvicorn.workers.UvicornWorker, 配置为 config.settings_asgi)处理,
+nginx 只把这几个路径转发过去, 其他同步接口(如代码执行依赖主线程的 signal)仍由 WSGI 进程处理;
+在 WSGI 下(如 runserver)这些视图同样可用, 但流式响应会被缓冲
+路径与 ChatViewSet/AIConfigViewSet 的其他动作相同, 在 urls 中注册在 router 之前
+DRF 视图不支持 async, 这里用 Django 的异步视图, 认证沿用 simplejwt, 数据库访问使用 ORM 的异步接口
+"""
+import json
+import logging
+import uuid
+from functools import wraps
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .ai_service import AIServiceFactory, normalize_models
+from .chat_context import assemble_context, claim_summary
+from . import http_client
+from .models import AIConfig, ChatHistory
+from .serializers import ChatMessageSerializer
+from .sse import sse_event
+from .tasks import summarize_chat_session
+
+
+logger = logging.getLogger(__name__)
+
+_jwt = JWTAuthentication()
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def async_api_view(methods):
+    """
+    异步视图装饰器: 检查请求方法, 用 JWT 认证并要求已登录, 解析 JSON 请求体到 request.data
+    错误响应的格式与 DRF 相同
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _json({'detail': f'方法 “{request.method}” 不被允许。'}, status=405)
+
+            try:
+                result = await sync_to_async(_jwt.authenticate)(request)
+            except AuthenticationFailed as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+                result, error = None, detail
+            else:
+                error = {'detail': '身份认证信息未提供。'}
+            if result is None:
+                response = _json(error, status=401)
+                response['WWW-Authenticate'] = _jwt.authenticate_header(request)
+                return response
+            request.user = result[0]
+
+            request.data = {}
+            if request.method == 'POST' and request.body:
+                try:
+                    request.data = json.loads(request.body)
+                except ValueError:
+                    return _json({'detail': 'JSON 解析错误'}, status=400)
+            return await view(request, *args, **kwargs)
+
+        # django.views.decorators.csrf.csrf_exempt 在 Django 4.2 中不支持异步视图; 使用 JWT 认证, 不需要 CSRF
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+async def _schedule_summary(user, session_id):
+    """有超出上下文预算的较早消息时, 交给 Celery 合并进会话摘要"""
+    try:
+        if await sync_to_async(claim_summary)(user.pk, session_id):
+            await sync_to_async(summarize_chat_session.delay)(user.pk, session_id)
+    except Exception as e:
+        logger.warning('提交对话摘要任务失败: %s', e)
+
+
+async def _start_chat(request):
+    """
+    校验请求, 保存用户消息
+    :return: (ai_service, session_id, context, None) 或出错时 (None, None, None, (错误数据, 状态码)),
+             context 为 assemble_context 的返回值
+    """
+    serializer = ChatMessageSerializer(data=request.data)
+    if not serializer.is_valid():
+        return None, None, None, (serializer.errors, 400)
+
+    message = serializer.validated_data['message']
+    session_id = serializer.validated_data.get('session_id') or str(uuid.uuid4())
+    extra_context = serializer.validated_data.get('extra_context', {})
+
+    ai_config = await AIConfig.objects.filter(user=request.user, is_active=True).afirst()
+    if not ai_config:
+        return None, None, None, ({'error': '请先配置AI服务'}, 400)
+    try:
+        ai_service = AIServiceFactory.create(ai_config)
+    except ValueError as e:
+        return None, None, None, ({'error': str(e)}, 400)
+
+    await ChatHistory.objects.acreate(
+        user=request.user,
+        session_id=session_id,
+        role='user',
+        content=message,
+        context=extra_context
+    )
+    return ai_service, session_id, await assemble_context(request.user, session_id, ai_config), None
+
+
+@async_api_view(['POST'])
+async def chat_send(request):
+    """发送消息"""
+    ai_service, session_id, context, error = await _start_chat(request)
+    if error:
+        return _json(*error)
+    messages, overflow = context
+
+    try:
+        response_content = await ai_service.achat(messages)
+    except Exception as e:
+        return _json({'error': f'AI服务调用失败: {str(e)}'}, status=500)
+
+    assistant_msg = await ChatHistory.objects.acreate(
+        user=request.user,
+        session_id=session_id,
+        role='assistant',
+        content=response_content
+    )
+    if overflow:
+        await _schedule_summary(request.user, session_id)
+    return _json({
+        'session_id': session_id,
+        'message': response_content,
+        'timestamp': assistant_msg.created_at
+    })
+
+
+@async_api_view(['POST'])
+async def chat_stream(request):
+    """
+    发送消息, 以 Server-Sent Events 逐段返回回复
+    事件: session(会话ID) -> 多个 data({"delta": ...}) -> done(消息ID和时间) 或 error
+    """
+    ai_service, session_id, context, error = await _start_chat(request)
+    if error:
+        data, status = error
+        return HttpResponse(sse_event(data, 'error'), status=status, content_type='text/event-stream; charset=utf-8')
+
+    response = StreamingHttpResponse(
+        _stream_reply(request.user, session_id, ai_service, *context),
+        content_type='text/event-stream; charset=utf-8'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # 不让nginx缓冲响应, 收到一段转发一段
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _stream_reply(user, session_id, ai_service, messages, overflow):
+    yield sse_event({'session_id': session_id}, 'session')
+    parts = []
+    saved = False
+    try:
+        async for delta in ai_service.astream_chat(messages):
+            parts.append(delta)
+            yield sse_event({'delta': delta})
+        assistant_msg = await ChatHistory.objects.acreate(
+            user=user,
+            session_id=session_id,
+            role='assistant',
+            content=''.join(parts)
+        )
+        saved = True
+        yield sse_event({
+            'session_id': session_id,
+            'message_id': assistant_msg.pk,
+            'timestamp': assistant_msg.created_at,
+        }, 'done')
+        if overflow:
+            await _schedule_summary(user, session_id)
+    except Exception as e:
+        logger.warning('AI流式响应失败: %s', e)
+        yield sse_event({'error': f'AI服务调用失败: {str(e)}'}, 'error')
+    finally:
+        # 出错或客户端中途断开时, 保存已经生成的部分
+        if parts and not saved:
+            await ChatHistory.objects.acreate(
+                user=user,
+                session_id=session_id,
+                role='assistant',
+                content=''.join(parts)
+            )
+
+
+@async_api_view(['POST'])
+async def ai_config_test(request, pk):
+    """测试AI配置"""
+    config = await AIConfig.objects.filter(user=request.user, pk=pk).afirst()
+    if config is None:
+        return _json({'detail': '未找到。'}, status=404)
+
+    try:
+        ai_service = AIServiceFactory.create(config)
+        messages = [{'role': 'user', 'content': 'Hello'}]
+        response = await ai_service.achat(messages)
+        return _json({'status': 'success', 'response': response})
+    except Exception as e:
+        return _json({'status': 'error', 'error': str(e)}, status=400)
+
+
+@async_api_view(['GET'])
+async def ai_config_models(request):
+    """获取可用模型列表"""
+    provider = request.GET.get('provider')
+    api_endpoint = request.GET.get('api_endpoint')
+
+    # 当查询参数缺失时尝试使用当前配置
+    if not provider or not api_endpoint:
+        current_config = await AIConfig.objects.filter(user=request.user).afirst()
+        if current_config:
+            provider = provider or current_config.provider
+            api_endpoint = api_endpoint or current_config.api_endpoint
+
+    if not provider:
+        return _json({'detail': '缺少provider参数'}, status=400)
+
+    if provider not in ('ollama_local', 'ollama_remote'):
+        return _json({'detail': '当前仅支持同步Ollama模型'}, status=400)
+
+    if not api_endpoint:
+        return _json({'detail': '缺少api_endpoint参数'}, status=400)
+
+    endpoint = api_endpoint.rstrip('/')
+
+    try:
+        resp = await http_client.aget(f'{endpoint}/api/tags')
+        resp.raise_for_status()
+    except httpx.HTTPError as exc:
+        logger.warning('无法连接到 Ollama 服务: %s', exc)
+        fallback_models = [
+            {'name': 'qwen3:8b', 'display_name': 'qwen3:8b'},
+            {'name': 'llama3:8b', 'display_name': 'llama3:8b'},
+        ]
+        return _json(
+            {
+                'models': fallback_models,
+                'warning': '无法连接到 Ollama 服务，请检查服务是否已启动或更新端点配置。已提供默认模型列表以便继续配置。'
+            }
+        )
+
+    data = resp.json() if resp.content else {}
+    return _json({'models': normalize_models(data)})
@@ -0,0 +1,72 @@
+"""
+课程内容缓存
+缓存键带内容版本号, 课程/课时等内容保存或删除时版本号递增, 旧缓存随之失效;
+缓存未命中时用锁保证只有一个请求重新生成数据(single-flight), 其余请求等待结果
+"""
+import time
+
+from django.core.cache import cache
+
+
+CONTENT_VERSION_KEY = 'content_version'
+
+# 生成数据的锁超时时间(秒), 持锁请求异常退出时锁自动释放
+BUILD_LOCK_TIMEOUT = 30
+# 等待其他请求生成数据的最长时间(秒)
+BUILD_WAIT = 5
+BUILD_POLL_INTERVAL = 0.05
+
+
+def get_content_version():
+    """当前内容版本号"""
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        # 版本号被淘汰时用时间戳重新初始化, 避免与旧版本号重复
+        cache.add(CONTENT_VERSION_KEY, int(time.time()), None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def bump_content_version():
+    """内容发生变化, 使所有带版本号的缓存失效"""
+    try:
+        return cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        cache.add(CONTENT_VERSION_KEY, int(time.time()), None)
+        return cache.get(CONTENT_VERSION_KEY)
+
+
+def content_key(name, *parts):
+    """带内容版本号的缓存键"""
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{name}:v{get_content_version()}:{suffix}'
+
+
+def get_or_build(key, builder, timeout=3600):
+    """
+    读取缓存, 未命中时调用 builder 生成并写入
+    同一个键同时只有一个请求执行 builder, 其余请求轮询等待结果, 等待超时后自行生成
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, BUILD_LOCK_TIMEOUT):
+        try:
+            value = builder()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + BUILD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(BUILD_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        if not cache.has_key(lock_key):
+            # 持锁请求失败(例如对象不存在), 由本请求自己生成
+            break
+    return builder()
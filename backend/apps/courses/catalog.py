@@ -0,0 +1,89 @@
+"""
+课程目录快照
+分类 -> 课程 -> 课时摘要的完整目录树, 内容变化(内容版本号递增)时才重新生成;
+生成时一次性序列化为 JSON 并预先压缩(gzip, 安装了 brotli 时同时生成 br),
+请求时按 Accept-Encoding 直接返回对应的字节
+"""
+import gzip
+import hashlib
+
+from django.db.models import Count, Q
+from rest_framework.renderers import JSONRenderer
+
+from .cache import content_key, get_or_build
+from .models import Course, CourseCategory, Lesson
+from .projection import project_queryset
+from .serializers import CourseCategorySerializer, CourseListSerializer, LessonListSerializer
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+
+CATALOG_TIMEOUT = 24 * 3600
+
+
+def build_catalog():
+    """生成目录树(三次查询)"""
+    # 注解计数带 GROUP BY 时 Django 忽略 Meta.ordering, 显式排序才能保证目录顺序和摘要稳定
+    categories = CourseCategory.objects.filter(is_active=True).annotate(
+        courses_count=Count('courses', filter=Q(courses__is_published=True))
+    ).order_by('order', 'id')
+    courses = project_queryset(
+        Course.objects.filter(is_published=True), CourseListSerializer
+    ).annotate(
+        lessons_count=Count('lessons', filter=Q(lessons__is_published=True))
+    ).order_by('order', 'id')
+    lessons = project_queryset(
+        Lesson.objects.filter(is_published=True), LessonListSerializer, extra=['course']
+    ).order_by('course_id', 'day_number')
+
+    lessons_by_course = {}
+    for lesson in lessons:
+        lessons_by_course.setdefault(lesson.course_id, []).append(lesson)
+
+    courses_by_category = {}
+    for course in courses:
+        data = CourseListSerializer(course).data
+        data['lessons'] = LessonListSerializer(lessons_by_course.get(course.pk, []), many=True).data
+        courses_by_category.setdefault(course.category_id, []).append(data)
+
+    tree = []
+    for category in categories:
+        data = CourseCategorySerializer(category).data
+        data['courses'] = courses_by_category.get(category.pk, [])
+        tree.append(data)
+    return {'categories': tree}
+
+
+def build_snapshot():
+    """序列化并预压缩目录树"""
+    body = JSONRenderer().render(build_catalog())
+    digest = hashlib.md5(body).hexdigest()
+    snapshot = {
+        'digest': digest,
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+    }
+    if brotli is not None:
+        snapshot['br'] = brotli.compress(body, quality=11)
+    return snapshot
+
+
+def get_snapshot():
+    return get_or_build(content_key('catalog'), build_snapshot, CATALOG_TIMEOUT)
+
+
+def choose_encoding(accept_encoding, snapshot):
+    """按 Accept-Encoding 选择已有的压缩格式: br > gzip > 不压缩"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    for encoding in ('br', 'gzip'):
+        if encoding in snapshot and (encoding in accepted or '*' in accepted):
+            return encoding
+    return 'identity'
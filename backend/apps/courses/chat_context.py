@@ -0,0 +1,170 @@
+"""
+AI对话的上下文组装
+按模型的上下文长度确定每轮的 token 预算, 从最新的消息往前取, 直到用完预算;
+更早的消息由 Celery 任务合并进会话的滚动摘要(ChatSession.summary), 以一条 system 消息放在最前面
+每轮发给模型的 prompt 长度因此有上限, 不会随会话变长一直增长
+"""
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .ai_service import AIServiceFactory
+from .models import ChatHistory, ChatSession
+
+
+# 模型名前缀 -> 上下文长度(tokens), 按顺序匹配
+CONTEXT_WINDOWS = (
+    ('gpt-4o', 128000),
+    ('gpt-4-turbo', 128000),
+    ('gpt-4', 8192),
+    ('gpt-3.5-turbo', 16385),
+    ('deepseek', 65536),
+)
+DEFAULT_CONTEXT_WINDOW = 4096
+# 未设置 num_ctx 时 Ollama 使用的上下文长度
+OLLAMA_CONTEXT_WINDOW = 2048
+MIN_BUDGET = 256
+# 每条消息的角色和分隔符大约占用的 tokens
+MESSAGE_OVERHEAD = 4
+# 组装上下文时最多读取的未摘要消息数
+MAX_HISTORY = 200
+SUMMARY_LOCK_TIMEOUT = 300
+
+CJK_RE = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+ROLE_NAMES = {'user': '用户', 'assistant': '助手', 'system': '系统'}
+
+SUMMARY_PROMPT = (
+    '你负责维护一段对话的摘要。请把新的对话内容合并进已有摘要, 输出更新后的完整摘要: '
+    '保留用户的问题和目标、已经得出的结论、涉及的代码和名称, 省略寒暄和重复内容, 不超过300字, 只输出摘要本身。'
+)
+
+
+def estimate_tokens(text):
+    """粗略估算 token 数: 中日韩字符约 1 个 token, 其他字符约 4 个一个 token"""
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def message_tokens(message):
+    return estimate_tokens(message['content']) + MESSAGE_OVERHEAD
+
+
+def context_window(config):
+    if config.provider in ('ollama_local', 'ollama_remote'):
+        return OLLAMA_CONTEXT_WINDOW
+    name = (config.model_name or '').lower()
+    for prefix, window in CONTEXT_WINDOWS:
+        if name.startswith(prefix):
+            return window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def context_budget(config):
+    """
+    每轮上下文的 token 预算: 上下文长度减去为回复预留的部分, 不超过 AI_CONTEXT_MAX_TOKENS
+    回复预留 max_tokens, 但最多占上下文的一半(max_tokens 常按大模型配置, 不能把小上下文的模型挤没)
+    """
+    window = context_window(config)
+    reserve = min(config.max_tokens, window // 2)
+    return max(min(window - reserve, settings.AI_CONTEXT_MAX_TOKENS), MIN_BUDGET)
+
+
+def split_turns(history, budget):
+    """
+    按预算从新到旧保留消息, 最新的一条总是保留
+    :param history: 消息列表, 从新到旧
+    :return: (保留的消息, 超出预算的消息), 均为从旧到新
+    """
+    used = 0
+    for index, message in enumerate(history):
+        used += message_tokens(message)
+        if index and used > budget:
+            return history[:index][::-1], history[index:][::-1]
+    return history[::-1], []
+
+
+def summary_message(summary):
+    return {'role': 'system', 'content': f'以下是本次对话中较早内容的摘要:\n{summary}'}
+
+
+def _unsummarized(user_id, session_id, summarized_until):
+    return ChatHistory.objects.filter(
+        user_id=user_id,
+        session_id=session_id,
+        id__gt=summarized_until
+    ).order_by('-created_at', '-id').values('id', 'role', 'content')
+
+
+async def assemble_context(user, session_id, config):
+    """
+    组装本轮发给模型的消息: 会话摘要 + 预算内最新的消息
+    :return: (消息列表, 是否有超出预算、需要合并进摘要的消息)
+    """
+    session = await ChatSession.objects.filter(
+        user=user, session_id=session_id
+    ).only('summary', 'summarized_until').afirst()
+    summary, summarized_until = (session.summary, session.summarized_until) if session else ('', 0)
+
+    prefix = [summary_message(summary)] if summary else []
+    budget = context_budget(config) - sum(message_tokens(message) for message in prefix)
+    history = [message async for message in _unsummarized(user.pk, session_id, summarized_until)[:MAX_HISTORY]]
+    kept, overflow = split_turns(history, budget)
+
+    messages = prefix + [{'role': message['role'], 'content': message['content']} for message in kept]
+    return messages, bool(overflow) or len(history) == MAX_HISTORY
+
+
+def fold_history(config, session_id):
+    """
+    把超出预算的较早消息合并进会话摘要(在 Celery 任务中调用, 会请求一次模型)
+    合并后只保留约一半预算的最新消息, 留出余量, 不必每轮都重新摘要
+    :return: 是否更新了摘要
+    """
+    session, _ = ChatSession.objects.get_or_create(user_id=config.user_id, session_id=session_id)
+    budget = context_budget(config) - estimate_tokens(session.summary)
+    history = list(_unsummarized(config.user_id, session_id, session.summarized_until))
+    _, overflow = split_turns(history, budget // 2)
+    if not overflow:
+        return False
+
+    # 摘要请求本身也要放得进上下文: 扣除指令和已有摘要后, 一次最多合并剩余预算的消息, 其余留给下一次
+    prompt = [
+        {'role': 'system', 'content': SUMMARY_PROMPT},
+        {'role': 'user', 'content': f'已有摘要:\n{session.summary or "无"}\n\n新的对话:\n'},
+    ]
+    batch_budget = context_budget(config) - sum(message_tokens(message) for message in prompt)
+    batch = overflow[:1]
+    used = message_tokens(batch[0])
+    for message in overflow[1:]:
+        used += message_tokens(message)
+        if used > batch_budget:
+            break
+        batch.append(message)
+
+    prompt[1]['content'] += '\n'.join(
+        f"{ROLE_NAMES.get(message['role'], message['role'])}: {message['content']}" for message in batch
+    )
+    summary = AIServiceFactory.create(config).chat(prompt).strip()
+    if not summary:
+        return False
+
+    # 期间有其他任务更新过摘要时放弃这次的结果
+    return bool(ChatSession.objects.filter(
+        pk=session.pk, summarized_until=session.summarized_until
+    ).update(summary=summary, summarized_until=batch[-1]['id'], updated_at=timezone.now()))
+
+
+def summary_lock_key(user_id, session_id):
+    return f'chat_summary:{user_id}:{session_id}'
+
+
+def claim_summary(user_id, session_id):
+    """同一会话同时只提交一个摘要任务"""
+    return cache.add(summary_lock_key(user_id, session_id), 1, SUMMARY_LOCK_TIMEOUT)
+
+
+def release_summary(user_id, session_id):
+    cache.delete(summary_lock_key(user_id, session_id))
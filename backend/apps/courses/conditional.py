@@ -0,0 +1,89 @@
+"""
+只读接口的条件请求(ETag / If-None-Match)
+在序列化之前用一次索引查询计算 ETag, 与请求中的 If-None-Match 匹配时直接返回 304,
+不执行序列化也不返回响应体
+
+ETag 由以下内容计算:
+- 详情: 对象的 updated_at (及 etag_annotations 中的附加值), 以及完整的查询参数
+- 列表: 过滤后结果的条数与最大 updated_at (及 etag_aggregates 中的附加值), 以及完整的查询参数
+- 以上两者都加上内容版本号(嵌套的分类、课时等变化时随之变化)
+浏览/点赞计数不参与计算, 因此是弱 ETag
+"""
+import functools
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+
+from . import counters
+from .cache import get_content_version
+
+
+def conditional(method):
+    """视图集 list/retrieve 方法的装饰器: 先检查 ETag, 未变化时返回 304"""
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                self.on_not_modified()
+                return not_modified
+        response = method(self, request, *args, **kwargs)
+        if etag and response.status_code == 200:
+            response['ETag'] = etag
+        return response
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """视图集混入: list/retrieve 支持 ETag 条件请求"""
+    # 详情返回 304 时仍然计入浏览次数(counters 中的模型名)
+    view_counter = None
+
+    def get_etag_queryset(self):
+        """计算 ETag 使用的查询集(不含序列化用的注解和关联)"""
+        return self.filter_queryset(self.queryset.all())
+
+    def etag_annotations(self):
+        """详情 ETag 需要附加的注解, 例如当前用户的学习进度"""
+        return {}
+
+    def etag_aggregates(self):
+        """列表 ETag 需要附加的聚合, 例如用 F() 更新、不改变 updated_at 的统计字段"""
+        return {}
+
+    def get_etag(self, request):
+        queryset = self.get_etag_queryset()
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            annotations = self.etag_annotations()
+            row = queryset.annotate(**annotations).values_list('pk', 'updated_at', *annotations).first()
+            if row is None:
+                return None
+            self._etag_pk = row[0]
+            # 附加注解的值留给视图使用, 避免再查询一次
+            self._etag_values = dict(zip(annotations, row[2:]))
+            parts = (request.get_full_path(), *row)
+        else:
+            parts = (
+                request.get_full_path(),
+                *queryset.order_by().aggregate(
+                    total=Count('pk'), last=Max('updated_at'), **self.etag_aggregates()
+                ).values(),
+            )
+        signature = '|'.join(str(part) for part in (self.action, get_content_version(), *parts))
+        return f'W/"{hashlib.md5(signature.encode()).hexdigest()}"'
+
+    def on_not_modified(self):
+        if self.action == 'retrieve' and self.view_counter:
+            counters.incr(self.view_counter, self._etag_pk, 'view_count')
+
+    @conditional
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
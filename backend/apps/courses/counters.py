@@ -0,0 +1,156 @@
+"""
+浏览/点赞/下载计数的写回缓冲
+计数增量先累加在 Redis 哈希中(HINCRBY), 由 Celery beat 定时任务批量写回数据库,
+浏览、点赞和下载请求不再对热点行加写锁; 读取时把尚未写回的增量合并进响应
+Redis 不可用时退化为直接更新数据库; 点赞去重记录在数据库(LikeRecord)中, 与 Redis 是否可用无关
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from .models import Course, Lesson, LessonResource, LikeRecord, UserNote
+
+
+logger = logging.getLogger(__name__)
+
+COUNTER_MODELS = {
+    'course': Course,
+    'lesson': Lesson,
+    'note': UserNote,
+    'resource': LessonResource,
+}
+
+# 各模型缓冲的计数字段
+COUNTER_FIELDS = {
+    'course': ('view_count', 'like_count'),
+    'lesson': ('view_count', 'like_count'),
+    'note': ('like_count',),
+    'resource': ('download_count',),
+}
+
+
+def _pending_key(name):
+    return f'counters:{name}'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _update_db(name, pk, field, amount):
+    COUNTER_MODELS[name].objects.filter(pk=pk).update(**{field: F(field) + amount})
+
+
+def incr(name, pk, field, amount=1):
+    """累加计数(写入 Redis, 稍后批量写回)"""
+    try:
+        _redis().hincrby(_pending_key(name), f'{pk}:{field}', amount)
+    except RedisError:
+        logger.warning('计数缓冲不可用, 直接写入数据库: %s %s %s', name, pk, field)
+        _update_db(name, pk, field, amount)
+
+
+def like(name, pk, user_id):
+    """
+    点赞(每个用户只计一次, 由 LikeRecord 的唯一约束去重)
+    :return: 是否为新的点赞
+    """
+    _, created = LikeRecord.objects.get_or_create(user_id=user_id, target=name, object_id=pk)
+    if created:
+        incr(name, pk, 'like_count')
+    return created
+
+
+def pending(name, pk):
+    """尚未写回数据库的增量 {字段: 增量}"""
+    fields = [f'{pk}:{field}' for field in COUNTER_FIELDS[name]]
+    try:
+        values = _redis().hmget(_pending_key(name), fields)
+    except RedisError:
+        return {}
+    return {field: int(value) for field, value in zip(COUNTER_FIELDS[name], values) if value and int(value)}
+
+
+def merge_pending(name, data):
+    """把尚未写回的增量合并进序列化后的数据(原地修改并返回)"""
+    for field, amount in pending(name, data['id']).items():
+        if field in data:
+            data[field] += amount
+    return data
+
+
+def overlay_counts(name, data, extra=()):
+    """
+    用数据库中的最新计数(加上未写回的增量)覆盖缓存数据中的计数
+    :param extra: 同时从数据库读取的其他计数字段(不经过缓冲)
+    """
+    row = COUNTER_MODELS[name].objects.filter(pk=data['id']).values(*COUNTER_FIELDS[name], *extra).first()
+    if row:
+        data.update(row)
+    return merge_pending(name, data)
+
+
+def current_count(name, instance, field):
+    """数据库中的最新计数加上尚未写回的增量(Redis 不可用时增量已直接写入数据库, 实例上的值是旧的)"""
+    count = COUNTER_MODELS[name].objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    return (count or 0) + pending(name, instance.pk).get(field, 0)
+
+
+def flush(name):
+    """
+    把一个模型的计数增量写回数据库
+    先在一个事务中读出并删除缓冲哈希(之后的增量写入新的哈希), 再写数据库:
+    增量只会被一次写回领取, 写数据库后不再需要清理 Redis, 不会重复累加;
+    写数据库失败时把增量加回缓冲哈希, 下次执行时重试
+    :return: 写回的行数
+    """
+    conn = _redis()
+    pending_key = _pending_key(name)
+    pipe = conn.pipeline(transaction=True)
+    pipe.hgetall(pending_key)
+    pipe.delete(pending_key)
+    claimed, _ = pipe.execute()
+
+    deltas = {}
+    for key, amount in claimed.items():
+        pk, field = key.decode().split(':', 1)
+        if field in COUNTER_FIELDS[name] and int(amount):
+            deltas.setdefault(field, {})[int(pk)] = int(amount)
+
+    pks = set()
+    updates = {}
+    for field, per_pk in deltas.items():
+        pks.update(per_pk)
+        updates[field] = F(field) + Case(
+            *[When(pk=pk, then=Value(amount)) for pk, amount in per_pk.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    if not updates:
+        return 0
+    try:
+        with transaction.atomic():
+            COUNTER_MODELS[name].objects.filter(pk__in=pks).update(**updates)
+    except Exception:
+        _restore(conn, pending_key, claimed)
+        raise
+    return len(pks)
+
+
+def _restore(conn, pending_key, claimed):
+    """把领取后未能写回的增量加回缓冲哈希"""
+    try:
+        pipe = conn.pipeline(transaction=True)
+        for key, amount in claimed.items():
+            pipe.hincrby(pending_key, key, int(amount))
+        pipe.execute()
+    except RedisError:
+        logger.error('计数增量写回失败且无法放回缓冲, 已丢失: %s %s', pending_key, claimed)
+
+
+def flush_all():
+    """写回全部模型的计数增量"""
+    return {name: flush(name) for name in COUNTER_MODELS}
@@ -0,0 +1,138 @@
+"""
+文件下载
+配置了 MEDIA_ACCEL_PREFIX 时通过 X-Accel-Redirect 交给 nginx 发送(nginx 自行处理 Range);
+否则由 Django 发送, 支持单个 Range 和 If-Range, 可以断点续传.
+响应体交给 WSGI 服务器的 file_wrapper(gunicorn 下使用 sendfile), 不在 Python 中逐块读取
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+_RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    解析 Range 请求头, 只支持单个范围
+    :return: (起始位置, 结束位置) 均包含; 无法解析或多个范围时返回 None(按完整文件返回)
+    """
+    match = _RANGE_PATTERN.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # 最后 N 个字节
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def is_first_request(request):
+    """是否为一次新的下载(续传时的后续 Range 请求不计入下载次数)"""
+    if request.method != 'GET':
+        return False
+    header = request.headers.get('Range', '').replace(' ', '')
+    match = _RANGE_PATTERN.match(header)
+    return not match or match.group(1) == '0'
+
+
+def if_range_matches(request, etag, last_modified):
+    """If-Range 与当前文件一致时才按 Range 返回; ETag 使用强比较"""
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    value = value.strip()
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+class RangeFile:
+    """从指定位置开始、最多读取 length 字节的文件对象(保留 fileno 供 sendfile 使用)"""
+
+    def __init__(self, path, start, length):
+        self.file = open(path, 'rb')
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def accel_response(name, filename, content_type=None):
+    """交给 nginx 内部 location 发送 MEDIA_ROOT 下的文件"""
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = f'{settings.MEDIA_ACCEL_PREFIX}{quote(name)}'
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def ranged_file_response(request, path, filename, content_type=None):
+    """发送文件, 支持条件请求和单个 Range"""
+    stat = os.stat(path)
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    start, end, status = 0, size - 1, 200
+    range_header = request.headers.get('Range')
+    if range_header and request.method == 'GET' and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+        if byte_range:
+            (start, end), status = byte_range, 206
+
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    length = end - start + 1
+    response = FileResponse(
+        RangeFile(path, start, length), status=status, content_type=content_type,
+        as_attachment=True, filename=filename,
+    )
+    response['Content-Length'] = length
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,64 @@
+"""
+Markdown 标题切分
+按标题把课时内容切分为章节, 生成与前端 MarkdownViewer 一致的标题锚点
+"""
+import re
+
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$')
+FENCE_PATTERN = re.compile(r'^[ \t]*(```|~~~)')
+
+# 标题中的行内标记
+_INLINE_MARKUP = re.compile(r'!?\[([^\]]*)\]\([^)]*\)|[*_`~]|<[^>]+>')
+# 与前端一致: 只保留 ASCII 单词字符、常用汉字、连字符和空格
+_ANCHOR_STRIP = re.compile(r'[^\w\u4e00-\u9fff\- ]', re.ASCII)
+
+
+def heading_text(raw):
+    """去掉标题中的链接、强调等行内标记"""
+    return _INLINE_MARKUP.sub(lambda m: m.group(1) or '', raw).strip()
+
+
+def make_anchor(title, used):
+    """标题锚点, 同一篇内容中重复的锚点依次追加 -1, -2 ..."""
+    base = re.sub(r'\s+', '-', _ANCHOR_STRIP.sub('', title.strip().lower())) or 'section'
+    count = used.get(base, 0)
+    used[base] = count + 1
+    return f'{base}-{count}' if count else base
+
+
+def split_sections(content):
+    """
+    按标题切分内容(忽略代码块中的 #)
+    :return: [{'level', 'title', 'anchor', 'start', 'end'}, ...]
+             第一个标题之前的内容作为 level 为 0 的章节
+    """
+    sections = []
+    used = {}
+    in_fence = False
+    offset = 0
+    current = {'level': 0, 'title': '', 'anchor': '', 'start': 0}
+
+    for line in content.splitlines(keepends=True):
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING_PATTERN.match(line.rstrip('\r\n'))
+            if match:
+                current['end'] = offset
+                sections.append(current)
+                title = heading_text(match.group(2))
+                current = {
+                    'level': len(match.group(1)),
+                    'title': title,
+                    'anchor': make_anchor(title, used),
+                    'start': offset,
+                }
+        offset += len(line)
+
+    current['end'] = offset
+    sections.append(current)
+    # 去掉空的前言部分
+    if sections[0]['level'] == 0 and not content[:sections[0]['end']].strip():
+        sections.pop(0)
+    return sections
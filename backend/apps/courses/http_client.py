@@ -0,0 +1,171 @@
+"""
+AI服务的HTTP连接池
+同步: 按 (进程, 服务地址) 复用 requests.Session, 保持长连接, 省去每次请求的 TCP/TLS 握手;
+gunicorn fork 出的每个 worker 各自创建连接, 不会共用父进程的套接字
+异步: 按 (事件循环, 服务地址) 复用 httpx.AsyncClient, 供 async_views 使用
+重试: 连接失败(请求还没有发出)总是重试; 读取失败和 429/5xx 只对幂等请求(GET 等)重试,
+POST(对话请求)不重试, 以免重复生成回复; 重试间隔为带随机抖动的指数退避
+"""
+import asyncio
+import os
+import random
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = Retry.DEFAULT_ALLOWED_METHODS
+
+_sessions = OrderedDict()
+# id(事件循环) -> (事件循环, {服务地址: AsyncClient})
+_async_clients = {}
+_lock = threading.Lock()
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'.lower()
+
+
+def _build_session():
+    retry = Retry(
+        total=settings.AI_HTTP_RETRIES,
+        backoff_factor=settings.AI_HTTP_BACKOFF,
+        backoff_jitter=settings.AI_HTTP_BACKOFF,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=IDEMPOTENT_METHODS,
+        # 重试用完后返回最后一次的响应, 由调用方 raise_for_status
+        raise_on_status=False,
+    )
+    # 每个 Session 只连接一个服务地址, pool_maxsize 是对该地址保持的最大连接数
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.AI_HTTP_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _evict(clients):
+    """服务地址数量超过上限时移除最久未使用的连接池, 返回被移除的连接池"""
+    stale = []
+    while len(clients) > settings.AI_HTTP_MAX_HOSTS:
+        stale.append(clients.popitem(last=False)[1])
+    return stale
+
+
+def get_session(url):
+    """返回当前进程中 url 所在服务地址的 Session"""
+    key = (os.getpid(), _origin(url))
+    with _lock:
+        session = _sessions.get(key)
+        if session is not None:
+            _sessions.move_to_end(key)
+            return session
+        session = _sessions[key] = _build_session()
+        # 服务地址由用户配置, 连接池数量有上限
+        for stale in _evict(_sessions):
+            stale.close()
+        return session
+
+
+def timeout(stream=False):
+    """(连接超时, 读取超时); 流式请求的读取超时是两段数据之间的最长等待时间"""
+    read = settings.AI_HTTP_STREAM_READ_TIMEOUT if stream else settings.AI_HTTP_READ_TIMEOUT
+    return settings.AI_HTTP_CONNECT_TIMEOUT, read
+
+
+def request(method, url, stream=False, **kwargs):
+    kwargs.setdefault('timeout', timeout(stream))
+    return get_session(url).request(method, url, stream=stream, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def _build_async_client():
+    return httpx.AsyncClient(
+        # 传输层只重试连接失败
+        transport=httpx.AsyncHTTPTransport(
+            retries=settings.AI_HTTP_RETRIES,
+            limits=httpx.Limits(
+                max_connections=settings.AI_HTTP_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_HTTP_POOL_SIZE,
+            ),
+        ),
+        timeout=async_timeout(),
+    )
+
+
+def get_async_client(url):
+    """返回当前事件循环中 url 所在服务地址的 AsyncClient"""
+    loop = asyncio.get_running_loop()
+    origin = _origin(url)
+    with _lock:
+        entry = _async_clients.get(id(loop))
+        if entry is None or entry[0] is not loop:
+            # 清理已关闭的事件循环留下的客户端(WSGI 下每个异步视图在临时事件循环中运行)
+            for key in [key for key, (other, _) in _async_clients.items() if other.is_closed()]:
+                del _async_clients[key]
+            entry = _async_clients[id(loop)] = (loop, OrderedDict())
+        clients = entry[1]
+        client = clients.get(origin)
+        if client is not None:
+            clients.move_to_end(origin)
+            return client
+        client = clients[origin] = _build_async_client()
+        stale = _evict(clients)
+    for old in stale:
+        loop.create_task(old.aclose())
+    return client
+
+
+def async_timeout(stream=False):
+    connect, read = timeout(stream)
+    return httpx.Timeout(read, connect=connect)
+
+
+def _backoff(attempt):
+    return settings.AI_HTTP_BACKOFF * (2 ** attempt) + random.uniform(0, settings.AI_HTTP_BACKOFF)
+
+
+async def arequest(method, url, **kwargs):
+    """与 request 相同的重试规则: 幂等请求在读取失败或 429/5xx 时按退避间隔重试"""
+    client = get_async_client(url)
+    retries = settings.AI_HTTP_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0
+    for attempt in range(retries + 1):
+        try:
+            response = await client.request(method, url, **kwargs)
+        except (httpx.ReadError, httpx.ReadTimeout, httpx.RemoteProtocolError):
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS or attempt == retries:
+                return response
+            await response.aclose()
+        await asyncio.sleep(_backoff(attempt))
+
+
+async def aget(url, **kwargs):
+    return await arequest('GET', url, **kwargs)
+
+
+async def apost(url, **kwargs):
+    return await arequest('POST', url, **kwargs)
+
+
+def astream(method, url, **kwargs):
+    """流式请求, 用法: async with astream(...) as response"""
+    kwargs.setdefault('timeout', async_timeout(stream=True))
+    return get_async_client(url).stream(method, url, **kwargs)
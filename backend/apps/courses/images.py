@@ -0,0 +1,256 @@
+"""
+课程图片衍生文件
+为 res/ 下的原始图片生成多种宽度的 WebP/PNG 缩略图, 文件名中带内容哈希,
+并在导入课程时把 <img> 标签改写为 <picture>(WebP 的 <source> + 原格式的 <img>, 带 srcset、width/height 和懒加载)
+"""
+import hashlib
+import html
+import json
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image
+
+
+MANIFEST_NAME = 'manifest.json'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+COURSE_FOLDERS = [
+    'Day01-20', 'Day21-30', 'Day31-35', 'Day36-45', 'Day46-60',
+    'Day61-65', 'Day66-80', 'Day81-90', 'Day91-100', '番外篇', '公开课',
+]
+
+# 清单缓存: (mtime, 数据)
+_manifest_cache = {'mtime': None, 'data': {}}
+
+
+def get_course_base_dir():
+    """课程 Markdown 与 res 目录的根路径 - 优先使用挂载的course_resources目录"""
+    if Path('/app/course_resources').exists():
+        return Path('/app/course_resources')
+    if Path('/data').exists():
+        return Path('/data')
+    # 开发环境，使用相对于项目根目录的路径
+    return settings.BASE_DIR.parent
+
+
+def file_digest(path, length=12):
+    """计算文件内容哈希(分块读取, 避免大文件占用内存)"""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            md5.update(chunk)
+    return md5.hexdigest()[:length]
+
+
+def _normalize_mode(image, for_jpeg=False):
+    """WebP/JPEG 只接受 RGB(A), 调色板等模式需要先转换"""
+    if for_jpeg:
+        return image.convert('RGB') if image.mode != 'RGB' else image
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def gen_derivatives(infile, rel_path, digest, widths, output_root):
+    """
+    为一张图片生成所有宽度的衍生文件(在进程池中执行, 必须是模块级函数)
+    :param infile: 原图绝对路径
+    :param rel_path: 相对课程根目录的路径, 例如 Day01-20/res/day01/a.png
+    :param digest: 原图内容哈希
+    :param widths: 目标宽度列表
+    :param output_root: 衍生文件输出根目录
+    :return: 清单条目
+    """
+    rel = Path(rel_path)
+    out_dir = Path(output_root) / rel.parent
+    out_dir.mkdir(parents=True, exist_ok=True)
+    is_jpeg = rel.suffix.lower() in ('.jpg', '.jpeg')
+    fallback_ext = '.jpg' if is_jpeg else '.png'
+
+    with Image.open(infile) as image:
+        image.load()
+        orig_width, orig_height = image.size
+        # 比原图小的宽度才有意义, 原图本身很小时只做一次格式转换
+        targets = sorted({w for w in widths if w < orig_width}) or [orig_width]
+
+        variants = []
+        for width in targets:
+            height = max(1, round(orig_height * width / orig_width))
+            resized = image if width == orig_width else image.resize((width, height), Image.LANCZOS)
+            base = f'{rel.stem}-{width}w.{digest}'
+
+            webp_name = f'{base}.webp'
+            _normalize_mode(resized).save(out_dir / webp_name, format='WEBP', quality=80, method=4)
+
+            fallback_name = f'{base}{fallback_ext}'
+            if is_jpeg:
+                _normalize_mode(resized, for_jpeg=True).save(
+                    out_dir / fallback_name, format='JPEG', quality=82, optimize=True, progressive=True
+                )
+            else:
+                resized.save(out_dir / fallback_name, format='PNG', optimize=True)
+
+            variants.append({
+                'width': width,
+                'height': height,
+                'webp': (rel.parent / webp_name).as_posix(),
+                'fallback': (rel.parent / fallback_name).as_posix(),
+            })
+
+    return {
+        'digest': digest,
+        'width': orig_width,
+        'height': orig_height,
+        'variants': variants,
+    }
+
+
+def manifest_path():
+    return Path(settings.COURSE_DERIVATIVES_ROOT) / MANIFEST_NAME
+
+
+def load_manifest():
+    """读取衍生文件清单(按文件修改时间缓存)"""
+    path = manifest_path()
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+    if _manifest_cache['mtime'] != mtime:
+        with open(path, 'r', encoding='utf-8') as f:
+            _manifest_cache['data'] = json.load(f)
+        _manifest_cache['mtime'] = mtime
+    return _manifest_cache['data']
+
+
+def save_manifest(manifest):
+    """原子写入清单, 避免读者看到写了一半的文件"""
+    path = manifest_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def derivative_url(rel_path):
+    return f"{settings.COURSE_DERIVATIVES_URL}{rel_path}"
+
+
+def _parse_attrs(attr_text):
+    return re.findall(r'([\w:-]+)\s*=\s*"([^"]*)"', attr_text)
+
+
+def build_img_tag(entry, attrs):
+    """
+    根据清单条目生成响应式图片: <picture> 中的 <source> 提供 WebP, 不支持 WebP 的浏览器使用 <img> 中原格式的版本
+    :param entry: 清单条目
+    :param attrs: 原标签的属性列表 [(name, value), ...]
+    """
+    variants = entry['variants']
+    largest = variants[-1]
+    sizes = f'(max-width: {largest["width"]}px) 100vw, {largest["width"]}px'
+    kept = [
+        (name, value) for name, value in attrs
+        if name not in ('src', 'srcset', 'sizes', 'width', 'height', 'loading', 'decoding')
+    ]
+    source = '<source type="image/webp" srcset="{}" sizes="{}">'.format(
+        ', '.join(f'{derivative_url(v["webp"])} {v["width"]}w' for v in variants), sizes
+    )
+    parts = [
+        f'src="{derivative_url(largest["fallback"])}"',
+        'srcset="{}"'.format(', '.join(f'{derivative_url(v["fallback"])} {v["width"]}w' for v in variants)),
+        f'sizes="{sizes}"',
+        f'width="{entry["width"]}"',
+        f'height="{entry["height"]}"',
+        'loading="lazy"',
+        'decoding="async"',
+    ]
+    parts += [f'{name}="{value}"' for name, value in kept]
+    return f'<picture>{source}<img {" ".join(parts)}></picture>'
+
+
+_IMG_TAG_RE = re.compile(r'<img\s+([^>]*?)\s*/?>', re.IGNORECASE)
+_MD_IMAGE_RE = re.compile(r'!\[([^\]]*)\]\(/course-res/([^)\s]+)\)')
+_PICTURE_RE = re.compile(r'<picture>.*?</picture>', re.IGNORECASE | re.DOTALL)
+# 衍生文件名: <原文件名>-<宽度>w.<原图哈希>.<jpg|png>, 见 gen_derivatives
+_DERIVATIVE_RE = re.compile(r'^(?P<base>.+)-\d+w\.[0-9a-f]{12}(?P<ext>\.(?:jpg|png))$')
+
+# 衍生文件到原图的索引缓存: (清单, 索引)
+_source_index_cache = {'manifest': None, 'index': {}}
+
+
+def _fallback_ext(rel_path):
+    return '.jpg' if Path(rel_path).suffix.lower() in ('.jpg', '.jpeg') else '.png'
+
+
+def derivative_source(rel_path, manifest):
+    """
+    由衍生文件路径找回原图路径(哈希可以是旧版本的, 只看原文件名和格式)
+    Day01-20/res/a-640w.3f2a1b9c0d4e.png -> Day01-20/res/a.png
+    :return: 清单中的原图路径, 找不到时返回 None
+    """
+    if _source_index_cache['manifest'] is not manifest:
+        _source_index_cache['index'] = {
+            (Path(path).with_suffix('').as_posix(), _fallback_ext(path)): path for path in sorted(manifest)
+        }
+        _source_index_cache['manifest'] = manifest
+    match = _DERIVATIVE_RE.match(rel_path)
+    if not match:
+        return None
+    return _source_index_cache['index'].get((match.group('base'), match.group('ext')))
+
+
+def rewrite_img_tags(content, manifest=None):
+    """
+    把指向 /course-res/ 的图片改写为响应式 <picture> 标签(没有衍生文件的保持不变);
+    已经改写过的 <picture> 按 <img> 中衍生文件的路径找回原图, 按当前清单重新生成,
+    衍生文件重新生成(哈希变化)后再次执行也能得到最新的链接
+    """
+    from .assets import split_hashed_name
+
+    if manifest is None:
+        manifest = load_manifest()
+    if not manifest:
+        return content
+    prefix = settings.COURSE_RESOURCES_URL
+    derived_prefix = settings.COURSE_DERIVATIVES_URL
+
+    def replace_picture(match):
+        img = _IMG_TAG_RE.search(match.group(0))
+        if not img:
+            return match.group(0)
+        attrs = _parse_attrs(img.group(1))
+        src = dict(attrs).get('src', '')
+        if not src.startswith(derived_prefix):
+            return match.group(0)
+        entry = manifest.get(derivative_source(src[len(derived_prefix):], manifest))
+        if not entry:
+            return match.group(0)
+        return build_img_tag(entry, attrs)
+
+    def replace_tag(match):
+        attrs = _parse_attrs(match.group(1))
+        src = dict(attrs).get('src', '')
+        if not src.startswith(prefix):
+            return match.group(0)
+        path = src[len(prefix):]
+        # 资源链接可能已经改写为带哈希的 URL
+        entry = manifest.get(path) or manifest.get(split_hashed_name(path)[0])
+        if not entry:
+            return match.group(0)
+        return build_img_tag(entry, attrs)
+
+    def replace_markdown(match):
+        entry = manifest.get(match.group(2))
+        if not entry:
+            return match.group(0)
+        return build_img_tag(entry, [('alt', html.escape(match.group(1), quote=True))])
+
+    content = _PICTURE_RE.sub(replace_picture, content)
+    content = _IMG_TAG_RE.sub(replace_tag, content)
+    return _MD_IMAGE_RE.sub(replace_markdown, content)
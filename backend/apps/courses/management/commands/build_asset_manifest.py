@@ -0,0 +1,56 @@
+"""
+课程资源清单生成脚本
+为 res/ 目录下的每个文件计算内容哈希, 生成带哈希 URL 的清单,
+并在衍生文件目录下生成带哈希文件名的副本供 nginx 直接提供
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.courses.assets import (
+    is_course_resource, load_asset_manifest, save_asset_manifest, sync_asset_copies,
+)
+from apps.courses.images import COURSE_FOLDERS, file_digest, get_course_base_dir
+
+
+class Command(BaseCommand):
+    help = '生成课程资源文件的内容哈希清单(跳过未变化的文件)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='忽略已有清单, 重新计算全部哈希',
+        )
+
+    def handle(self, *args, **options):
+        base_dir = get_course_base_dir()
+        old_manifest = {} if options['force'] else load_asset_manifest()
+        manifest = {}
+        hashed = 0
+        start = time.time()
+
+        for folder in COURSE_FOLDERS:
+            folder_path = base_dir / folder
+            if not folder_path.exists():
+                continue
+            for path in sorted(folder_path.rglob('*')):
+                rel_path = path.relative_to(base_dir).as_posix()
+                if not path.is_file() or not is_course_resource(rel_path):
+                    continue
+
+                stat = path.stat()
+                entry = old_manifest.get(rel_path)
+                # mtime/size 都没变时沿用旧哈希
+                if not entry or entry['mtime_ns'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+                    entry = {'digest': file_digest(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+                    hashed += 1
+                manifest[rel_path] = entry
+
+        # 先准备好副本再发布清单, 页面中出现新的带哈希 URL 时 nginx 已经可以直接提供
+        copied, removed = sync_asset_copies(base_dir, manifest)
+        save_asset_manifest(manifest)
+        self.stdout.write(self.style.SUCCESS(
+            f'完成! 共 {len(manifest)} 个资源文件, 重新计算 {hashed} 个哈希, '
+            f'复制 {copied} 个、删除 {removed} 个副本, 耗时 {time.time() - start:.2f}秒'
+        ))
@@ -0,0 +1,122 @@
+"""
+课程图片衍生文件生成脚本
+使用进程池为 res/ 下的图片生成多种宽度的 WebP/PNG 缩略图
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.courses.images import (
+    COURSE_FOLDERS, IMAGE_EXTENSIONS, file_digest, gen_derivatives, get_course_base_dir,
+    load_manifest, save_manifest,
+)
+
+
+class Command(BaseCommand):
+    help = '为课程图片生成缩略图与 WebP 衍生文件(跳过未变化的图片)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help='进程池大小(默认CPU核数)',
+        )
+        parser.add_argument(
+            '--widths',
+            type=lambda s: [int(w) for w in s.split(',') if w],
+            default=settings.COURSE_IMAGE_WIDTHS,
+            help='逗号分隔的目标宽度, 例如 320,640,1280',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='忽略清单, 重新生成全部衍生文件',
+        )
+
+    def handle(self, *args, **options):
+        base_dir = get_course_base_dir()
+        output_root = Path(settings.COURSE_DERIVATIVES_ROOT)
+        widths = sorted(options['widths'])
+        manifest = {} if options['force'] else dict(load_manifest())
+
+        sources = {}
+        for folder in COURSE_FOLDERS:
+            folder_path = base_dir / folder
+            if not folder_path.exists():
+                continue
+            for path in folder_path.rglob('*'):
+                if path.suffix.lower() in IMAGE_EXTENSIONS and path.is_file():
+                    sources[path.relative_to(base_dir).as_posix()] = path
+
+        # 先用 mtime/size 快速判断, 变化了再计算内容哈希
+        pending = []
+        unchanged = 0
+        for rel_path, path in sorted(sources.items()):
+            stat = path.stat()
+            entry = manifest.get(rel_path)
+            if entry and entry.get('widths') == widths and self._outputs_exist(entry, output_root):
+                if entry.get('mtime_ns') == stat.st_mtime_ns and entry.get('size') == stat.st_size:
+                    unchanged += 1
+                    continue
+                digest = file_digest(path)
+                if entry['digest'] == digest:
+                    entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    unchanged += 1
+                    continue
+            else:
+                digest = file_digest(path)
+            pending.append((rel_path, path, digest, stat))
+
+        self.stdout.write(f'共 {len(sources)} 张图片, {unchanged} 张未变化, {len(pending)} 张需要处理')
+
+        start = time.time()
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(gen_derivatives, str(path), rel_path, digest, widths, str(output_root)): (rel_path, stat)
+                for rel_path, path, digest, stat in pending
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                rel_path, stat = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'  处理失败 {rel_path}: {e}'))
+                    continue
+
+                old_entry = manifest.get(rel_path)
+                if old_entry:
+                    self._remove_stale(old_entry, entry, output_root)
+                entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, widths=widths)
+                manifest[rel_path] = entry
+                if done % 50 == 0:
+                    self.stdout.write(f'  已处理 {done}/{len(pending)}')
+
+        # 源文件已删除的条目一并清理
+        for rel_path in set(manifest) - set(sources):
+            self._remove_stale(manifest.pop(rel_path), None, output_root)
+
+        save_manifest(manifest)
+        self.stdout.write(self.style.SUCCESS(
+            f'\n完成! 生成 {len(pending) - failed} 张, 失败 {failed} 张, 耗时 {time.time() - start:.2f}秒'
+        ))
+
+    def _variant_files(self, entry):
+        for variant in entry.get('variants', []):
+            yield variant['webp']
+            yield variant['fallback']
+
+    def _outputs_exist(self, entry, output_root):
+        return all((output_root / name).exists() for name in self._variant_files(entry))
+
+    def _remove_stale(self, old_entry, new_entry, output_root):
+        keep = set(self._variant_files(new_entry)) if new_entry else set()
+        for name in self._variant_files(old_entry):
+            if name not in keep:
+                (output_root / name).unlink(missing_ok=True)
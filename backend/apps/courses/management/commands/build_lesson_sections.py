@@ -0,0 +1,36 @@
+"""
+课时章节生成脚本
+为已有课时按标题切分章节(导入和修改课时时会自动生成, 用于补全旧数据)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.courses.models import Lesson
+from apps.courses.sections import sync_sections
+
+
+class Command(BaseCommand):
+    help = '按标题切分课时内容, 重建章节记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='每批处理的课时数',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        lessons = 0
+        sections = 0
+        for lesson in Lesson.objects.only('id', 'content').order_by('id').iterator(chunk_size=batch_size):
+            batch.append(lesson)
+            if len(batch) >= batch_size:
+                sections += sync_sections(batch)
+                lessons += len(batch)
+                batch = []
+        if batch:
+            sections += sync_sections(batch)
+            lessons += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'完成! {lessons} 个课时, 共 {sections} 个章节'))
@@ -0,0 +1,34 @@
+"""
+搜索索引生成脚本
+为已发布课时的各章节建立倒排索引, 供 /api/courses/search/ 使用
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.courses.models import Lesson
+from apps.courses.search import build_index, get_index_path, save_index
+
+
+class Command(BaseCommand):
+    help = '生成课时全文搜索索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='每次从数据库读取的课时数',
+        )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        lessons = Lesson.objects.filter(is_published=True).select_related('course').only(
+            'id', 'slug', 'title', 'content', 'course__slug', 'course__title'
+        ).order_by('id')
+        index = build_index(lessons.iterator(chunk_size=options['chunk_size']))
+        save_index(index)
+        self.stdout.write(self.style.SUCCESS(
+            f"搜索索引已生成: {len(index['docs'])} 个章节, {len(index['postings'])} 个词, "
+            f"耗时 {time.time() - start:.2f}秒 -> {get_index_path()}"
+        ))
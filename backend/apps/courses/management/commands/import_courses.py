@@ -4,10 +4,11 @@
 """
 import os
 import re
-from pathlib import Path
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from django.conf import settings
 from apps.courses.models import CourseCategory, Course, Lesson
+from apps.courses.images import get_course_base_dir, load_manifest, rewrite_img_tags
+from apps.courses.assets import load_asset_manifest, rewrite_asset_urls
 
 
 class Command(BaseCommand):
@@ -29,13 +30,14 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('数据已清空'))
 
         # 项目根目录 - 优先使用挂载的course_resources目录
-        if Path('/app/course_resources').exists():
-            base_dir = Path('/app/course_resources')
-        elif Path('/data').exists():
-            base_dir = Path('/data')
-        else:
-            # 开发环境，使用相对于项目根目录的路径
-            base_dir = settings.BASE_DIR.parent
+        base_dir = get_course_base_dir()
+
+        # 图片衍生文件清单(先运行 build_image_derivatives 生成)
+        self.image_manifest = load_manifest()
+        if not self.image_manifest:
+            self.stdout.write(self.style.WARNING('未找到图片衍生文件清单, 图片将保持原图链接'))
+        # 资源文件哈希清单(先运行 build_asset_manifest 生成)
+        self.asset_manifest = load_asset_manifest()
 
         # 定义课程分类
         categories_data = [
@@ -172,6 +174,9 @@ class Command(BaseCommand):
             f'\n导入完成! 共创建 {total_courses} 个课程, {total_lessons} 个课时'
         ))
 
+        # 课时内容变化后重新生成搜索索引
+        call_command('build_search_index')
+
     def _get_course_name(self, folder):
         """根据文件夹名生成课程名称"""
         mapping = {
@@ -276,7 +281,11 @@ class Command(BaseCommand):
             content
         )
         
-        return content
+        # 有衍生文件的图片改写为 <picture>(WebP + 原格式) + width/height + 懒加载
+        content = rewrite_img_tags(content, self.image_manifest)
+        
+        # 其余资源链接替换为带内容哈希的URL, 以便长期缓存
+        return rewrite_asset_urls(content, self.asset_manifest)
 
     def _estimate_duration(self, content):
         """根据内容长度估算课时时长(分钟)"""
@@ -0,0 +1,34 @@
+"""
+课程学习进度汇总修复脚本
+按课时进度记录从头重新计算 CourseProgress(增量维护出现偏差或补全旧数据时使用)
+"""
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from apps.courses.models import CourseProgress, UserProgress
+from apps.courses.progress import compute_course_progress
+
+
+class Command(BaseCommand):
+    help = '按课时学习进度重新计算课程学习进度汇总'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='只重新计算指定用户(用户名)',
+        )
+
+    def handle(self, *args, **options):
+        progress = UserProgress.objects.all()
+        rollups = CourseProgress.objects.all()
+        if options['user']:
+            progress = progress.filter(user__username=options['user'])
+            rollups = rollups.filter(user__username=options['user'])
+
+        with transaction.atomic():
+            rows = compute_course_progress(progress)
+            deleted, _ = rollups.delete()
+            CourseProgress.objects.bulk_create(rows, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f'完成! 删除 {deleted} 条, 重新生成 {len(rows)} 条课程进度汇总'))
@@ -0,0 +1,15 @@
+"""
+课时公开笔记数修复脚本
+按笔记表重新统计每个课时的公开笔记数(增量维护出现偏差或补全旧数据时使用)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.courses.notes import rebuild_public_note_counts
+
+
+class Command(BaseCommand):
+    help = '重新统计课时的公开笔记数'
+
+    def handle(self, *args, **options):
+        updated = rebuild_public_note_counts()
+        self.stdout.write(self.style.SUCCESS(f'完成! 更新了 {updated} 个课时'))
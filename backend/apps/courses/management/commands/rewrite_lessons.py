@@ -0,0 +1,152 @@
+"""
+课时内容批量改写命令
+流式遍历课时(内存占用固定), 应用已注册的改写函数, 只对有变化的行执行 bulk_update
+"""
+import difflib
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.courses.cache import bump_content_version
+from apps.courses.models import Lesson
+from apps.courses.rewrites import all_rewrites, get_rewrite
+from apps.courses.sections import sync_sections
+
+
+class Command(BaseCommand):
+    help = '使用已注册的改写函数批量修改课时内容'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'rewrites',
+            nargs='*',
+            help='要执行的改写名称(按顺序执行)',
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='列出所有已注册的改写',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只输出差异, 不写入数据库',
+        )
+        parser.add_argument(
+            '--course',
+            help='只处理指定课程(slug)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='每次从数据库读取的行数',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='每次 bulk_update 写回的行数',
+        )
+
+    def handle(self, *args, **options):
+        registered = all_rewrites()
+        if options['list'] or not options['rewrites']:
+            for name, rewrite in sorted(registered.items()):
+                self.stdout.write(f'{name:<20} {rewrite.description}')
+            return
+
+        unknown = [name for name in options['rewrites'] if name not in registered]
+        if unknown:
+            raise CommandError(f"未注册的改写: {', '.join(unknown)}")
+        rewrites = [get_rewrite(name) for name in options['rewrites']]
+
+        fields = []
+        reads = []
+        for rewrite in rewrites:
+            fields += [f for f in rewrite.fields if f not in fields]
+            reads += [f for f in rewrite.reads if f not in reads]
+        update_fields = fields + ['updated_at']
+
+        # 只读取需要的列, 关联字段通过 select_related 一并取回
+        related = sorted({f.split('__')[0] for f in reads if '__' in f})
+        queryset = Lesson.objects.order_by('pk').only('pk', *fields, *reads)
+        if related:
+            queryset = queryset.select_related(*related)
+        if options['course']:
+            queryset = queryset.filter(course__slug=options['course'])
+
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        batch = []
+        processed = 0
+        changed = 0
+        start = time.time()
+
+        for lesson in queryset.iterator(chunk_size=options['chunk_size']):
+            processed += 1
+            diffs = self._apply(lesson, rewrites)
+            if diffs:
+                changed += 1
+                if dry_run:
+                    self._print_diff(lesson, diffs)
+                else:
+                    lesson.updated_at = timezone.now()
+                    batch.append(lesson)
+                    if len(batch) >= batch_size:
+                        self._save(batch, update_fields)
+                        batch = []
+
+            if processed % options['chunk_size'] == 0:
+                self._progress(processed, changed, start)
+
+        if batch:
+            self._save(batch, update_fields)
+        # bulk_update 不触发信号, 手动使内容缓存失效
+        if changed and not dry_run:
+            bump_content_version()
+            if 'content' in fields:
+                call_command('build_search_index')
+
+        elapsed = time.time() - start
+        action = '需要更新' if dry_run else '已更新'
+        self.stdout.write(self.style.SUCCESS(
+            f'\n完成! 扫描 {processed} 个课时, {action} {changed} 个, '
+            f'耗时 {elapsed:.2f}秒 ({processed / elapsed if elapsed else processed:.0f} 行/秒)'
+        ))
+
+    def _save(self, batch, update_fields):
+        Lesson.objects.bulk_update(batch, update_fields)
+        # bulk_update 不触发信号, 内容变化时手动重建章节
+        if 'content' in update_fields:
+            sync_sections(batch)
+
+    def _apply(self, lesson, rewrites):
+        """依次应用改写, 返回 {字段: (旧值, 新值)}"""
+        diffs = {}
+        for rewrite in rewrites:
+            updates = rewrite(lesson) or {}
+            for field, value in updates.items():
+                old = getattr(lesson, field)
+                if old == value:
+                    continue
+                diffs[field] = (diffs[field][0] if field in diffs else old, value)
+                setattr(lesson, field, value)
+        return {field: pair for field, pair in diffs.items() if pair[0] != pair[1]}
+
+    def _print_diff(self, lesson, diffs):
+        self.stdout.write(self.style.WARNING(f'课时 {lesson.pk}:'))
+        for field, (old, new) in diffs.items():
+            diff = difflib.unified_diff(
+                str(old).splitlines(), str(new).splitlines(),
+                fromfile=f'{field} (旧)', tofile=f'{field} (新)', lineterm='', n=1
+            )
+            for line in diff:
+                self.stdout.write(f'  {line}')
+
+    def _progress(self, processed, changed, start):
+        elapsed = time.time() - start
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(f'  已扫描 {processed} 个课时, 变化 {changed} 个, {rate:.0f} 行/秒')
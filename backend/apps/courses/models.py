@@ -80,6 +80,8 @@ class Lesson(models.Model):
     is_published = models.BooleanField('是否发布', default=True)
     view_count = models.IntegerField('浏览次数', default=0)
     like_count = models.IntegerField('点赞数', default=0)
+    # 由笔记的写入接口维护, 避免每次打开课时都统计笔记
+    public_note_count = models.IntegerField('公开笔记数', default=0)
     created_at = models.DateTimeField('创建时间', auto_now_add=True)
     updated_at = models.DateTimeField('更新时间', auto_now=True)
     
@@ -93,6 +95,32 @@ class Lesson(models.Model):
         return f"Day{self.day_number:02d} - {self.title}"
 
 
+class LessonSection(models.Model):
+    """课时章节(按标题切分, 记录在正文中的字符位置)"""
+    lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.CASCADE,
+        related_name='sections',
+        verbose_name='所属课时'
+    )
+    order = models.PositiveIntegerField('顺序')
+    level = models.PositiveSmallIntegerField('标题级别', help_text='0表示第一个标题之前的内容')
+    title = models.CharField('标题', max_length=200, blank=True)
+    anchor = models.CharField('锚点', max_length=200, blank=True)
+    start = models.PositiveIntegerField('起始位置')
+    end = models.PositiveIntegerField('结束位置')
+    
+    class Meta:
+        verbose_name = '课时章节'
+        verbose_name_plural = verbose_name
+        ordering = ['lesson', 'order']
+        unique_together = ['lesson', 'order']
+        indexes = [models.Index(fields=['lesson', 'anchor'])]
+    
+    def __str__(self):
+        return f"{self.lesson} - {self.title or '(开头)'}"
+
+
 class LessonResource(models.Model):
     """课程资源"""
     lesson = models.ForeignKey(
@@ -166,6 +194,42 @@ class UserProgress(models.Model):
         return f"{self.user.username} - {self.lesson}"
 
 
+class CourseProgress(models.Model):
+    """用户的课程学习进度汇总(写入学习进度时在同一事务中增量维护)"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='course_progress',
+        verbose_name='用户'
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='user_progress',
+        verbose_name='课程'
+    )
+    completed_count = models.IntegerField('已完成课时数', default=0)
+    total_study_time = models.IntegerField('总学习时长(分钟)', default=0)
+    last_lesson = models.ForeignKey(
+        Lesson,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='最近学习的课时'
+    )
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+    
+    class Meta:
+        verbose_name = '课程学习进度'
+        verbose_name_plural = verbose_name
+        unique_together = ['user', 'course']
+        ordering = ['-updated_at']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.course}"
+
+
 class UserNote(models.Model):
     """用户笔记"""
     user = models.ForeignKey(
@@ -190,11 +254,45 @@ class UserNote(models.Model):
         verbose_name = '学习笔记'
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        # 笔记列表分别查询自己的笔记和公开笔记, 按 (created_at, id) 游标翻页
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['is_public', '-created_at', '-id']),
+        ]
     
     def __str__(self):
         return f"{self.user.username}的笔记 - {self.lesson}"
 
 
+class LikeRecord(models.Model):
+    """点赞记录(每个用户对同一对象只能点赞一次, 计数仍由 counters 缓冲写回)"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='用户'
+    )
+    target = models.CharField(
+        '点赞对象类型',
+        max_length=20,
+        choices=[
+            ('course', '课程'),
+            ('lesson', '课时'),
+            ('note', '笔记'),
+        ]
+    )
+    object_id = models.IntegerField('对象ID')
+    created_at = models.DateTimeField('点赞时间', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = '点赞记录'
+        verbose_name_plural = verbose_name
+        unique_together = ['user', 'target', 'object_id']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.target}:{self.object_id}"
+
+
 class AIConfig(models.Model):
     """AI配置"""
     user = models.OneToOneField(
@@ -263,3 +361,25 @@ class ChatHistory(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.role} - {self.created_at}"
+
+
+class ChatSession(models.Model):
+    """AI对话会话(较早的对话合并成滚动摘要, 组装上下文时代替原始消息)"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='chat_sessions',
+        verbose_name='用户'
+    )
+    session_id = models.CharField('会话ID', max_length=100)
+    summary = models.TextField('对话摘要', blank=True)
+    summarized_until = models.IntegerField('已摘要到的消息ID', default=0)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'AI对话会话'
+        verbose_name_plural = verbose_name
+        unique_together = ['user', 'session_id']
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.session_id}"
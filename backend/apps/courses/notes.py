@@ -0,0 +1,37 @@
+"""
+课时的公开笔记数
+Lesson.public_note_count 在笔记创建、修改、删除时按增量更新, 课时详情直接读取,
+不需要统计笔记; rebuild_note_counts 命令可以从头重新计算
+"""
+from collections import Counter
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Lesson, UserNote
+
+
+def adjust_public_note_counts(before, after):
+    """
+    按笔记修改前后的状态更新公开笔记数
+    :param before: 修改前的 (lesson_id, is_public), 新建时为 None
+    :param after: 修改后的 (lesson_id, is_public), 删除时为 None
+    """
+    deltas = Counter()
+    if before and before[1]:
+        deltas[before[0]] -= 1
+    if after and after[1]:
+        deltas[after[0]] += 1
+    for lesson_id, amount in deltas.items():
+        if amount:
+            Lesson.objects.filter(pk=lesson_id).update(public_note_count=F('public_note_count') + amount)
+
+
+def rebuild_public_note_counts():
+    """重新统计全部课时的公开笔记数, 返回更新的课时数"""
+    public_notes = UserNote.objects.filter(
+        lesson=OuterRef('pk'), is_public=True
+    ).order_by().values('lesson').annotate(total=Count('pk')).values('total')
+    return Lesson.objects.update(
+        public_note_count=Coalesce(Subquery(public_notes), 0, output_field=IntegerField())
+    )
@@ -0,0 +1,89 @@
+"""
+按 (created_at, id) 倒序的游标分页
+与 DRF 的 CursorPagination 不同, 可以对多个查询集分别按游标取一页后用 UNION 合并,
+每个查询集都走各自的 (过滤列, created_at, id) 索引, 翻页不使用 OFFSET
+"""
+import base64
+import binascii
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE or 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().rsplit('|', 1)
+            position = parse_datetime(created_at), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound('无效的游标')
+        if position[0] is None:
+            raise NotFound('无效的游标')
+        return position
+
+    def encode_cursor(self, created_at, pk):
+        raw = f'{created_at.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def paginate_union(self, querysets, request):
+        """
+        :param querysets: 结果取并集的查询集(同一个模型)
+        :return: 当前页的主键列表(按 created_at, id 倒序)
+        """
+        self.request = request
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        pages = []
+        for queryset in querysets:
+            if cursor:
+                created_at, pk = cursor
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+            pages.append(queryset.order_by('-created_at', '-id').values_list('id', 'created_at')[:size + 1])
+
+        if not pages:
+            rows = []
+        elif len(pages) == 1:
+            rows = list(pages[0])
+        elif connections[pages[0].db].features.supports_slicing_ordering_in_compound:
+            rows = list(pages[0].union(*pages[1:]).order_by('-created_at', '-id')[:size + 1])
+        else:
+            # SQLite 不支持 UNION 中带 LIMIT 的子查询, 分别查询后在内存中合并
+            merged = set().union(*(list(page) for page in pages))
+            rows = sorted(merged, key=lambda row: (row[1], row[0]), reverse=True)[:size + 1]
+
+        self.next_cursor = self.encode_cursor(*reversed(rows[size - 1])) if len(rows) > size else None
+        return [pk for pk, _ in rows[:size]]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
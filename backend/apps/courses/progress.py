@@ -0,0 +1,197 @@
+"""
+学习进度的写入
+- 批量心跳: 前端把阅读过程中的进度心跳攒成一批提交, 这里按课时合并后用一次插入
+  (已存在则忽略)和一次 UPDATE 写入, 而不是每条事件各自 get_or_create/save
+- 课程汇总(CourseProgress): 写入课时进度时在同一事务中按增量更新, 读取课程进度
+  不需要再统计课时进度记录; rebuild_course_progress 命令可以从头重新计算
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DateTimeField, F, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .cache import content_key, get_or_build
+from .models import Course, CourseProgress, Lesson, UserProgress
+
+
+def coalesce_events(events):
+    """
+    按课时合并心跳事件
+    进度取最大值(心跳可能乱序到达, 进度不会因为回看而降低), 学习时长累加,
+    开始时间取最早的事件时间, 完成时间取第一次达到100%的事件时间
+    :return: {lesson_id: {'progress', 'study_time', 'started_at', 'completed_at', 'last_at'}}
+    """
+    now = timezone.now()
+    merged = {}
+    for event in sorted(events, key=lambda e: e.get('timestamp') or now):
+        timestamp = min(event.get('timestamp') or now, now)
+        item = merged.setdefault(event['lesson_id'], {
+            'progress': 0, 'study_time': 0, 'started_at': None, 'completed_at': None,
+        })
+        item['last_at'] = timestamp
+        progress = event.get('progress_percentage', 0)
+        item['progress'] = max(item['progress'], progress)
+        item['study_time'] += event.get('study_time', 0)
+        if item['started_at'] is None and (progress > 0 or event.get('study_time', 0) > 0):
+            item['started_at'] = timestamp
+        if item['completed_at'] is None and progress >= 100:
+            item['completed_at'] = timestamp
+    return merged
+
+
+def _case(values, output_field, default=None, key='lesson_id'):
+    """按课时(或 key 指定的字段)取值的 CASE 表达式"""
+    return Case(
+        *[When(**{key: pk}, then=Value(value)) for pk, value in values.items()],
+        default=Value(default),
+        output_field=output_field,
+    )
+
+
+def apply_heartbeat(user, events):
+    """
+    写入一批进度心跳
+    :return: 更新的进度记录数
+    """
+    merged = coalesce_events(events)
+    courses = dict(Lesson.objects.filter(pk__in=merged, is_published=True).values_list('pk', 'course_id'))
+    lesson_ids = list(courses)
+    if not lesson_ids:
+        return 0
+    merged = {lesson_id: merged[lesson_id] for lesson_id in lesson_ids}
+
+    study_time = {pk: item['study_time'] for pk, item in merged.items()}
+    progress = {pk: item['progress'] for pk, item in merged.items()}
+    started = {pk: item['started_at'] for pk, item in merged.items() if item['started_at']}
+    completed = {pk: item['completed_at'] for pk, item in merged.items() if item['completed_at']}
+    in_progress = [pk for pk, item in merged.items() if item['started_at'] and not item['completed_at']]
+
+    updates = {
+        'study_time': F('study_time') + _case(study_time, IntegerField(), 0),
+        'progress_percentage': Greatest(F('progress_percentage'), _case(progress, IntegerField(), 0)),
+        'status': Case(
+            When(lesson_id__in=list(completed), then=Value('completed')),
+            When(Q(lesson_id__in=in_progress) & ~Q(status='completed'), then=Value('in_progress')),
+            default=F('status'),
+        ),
+        # update() 不会触发 auto_now
+        'last_accessed': Value(timezone.now()),
+    }
+    if started:
+        updates['started_at'] = Coalesce(F('started_at'), _case(started, DateTimeField()))
+    if completed:
+        updates['completed_at'] = Coalesce(F('completed_at'), _case(completed, DateTimeField()))
+
+    with transaction.atomic():
+        UserProgress.objects.bulk_create(
+            [UserProgress(user=user, lesson_id=pk) for pk in lesson_ids],
+            ignore_conflicts=True,
+        )
+        rows = UserProgress.objects.filter(user=user, lesson_id__in=lesson_ids)
+        # 锁定进度记录, 读取更新前的状态用于计算课程汇总的增量
+        previous = dict(rows.select_for_update().values_list('lesson_id', 'status'))
+        updated = rows.update(**updates)
+
+        deltas = {}
+        for pk, item in sorted(merged.items(), key=lambda pair: pair[1]['last_at']):
+            delta = deltas.setdefault(courses[pk], {'completed': 0, 'study_time': 0})
+            if item['completed_at'] and previous.get(pk) != 'completed':
+                delta['completed'] += 1
+            delta['study_time'] += item['study_time']
+            delta['last_lesson'] = pk
+        apply_course_deltas(user, deltas)
+    return updated
+
+
+def compute_course_progress(progress):
+    """
+    按用户和课程汇总课时进度记录
+    :param progress: UserProgress 查询集
+    :return: 未保存的 CourseProgress 对象列表
+    """
+    rollups = {}
+    rows = progress.order_by('last_accessed').values_list(
+        'user_id', 'lesson__course_id', 'lesson_id', 'status', 'study_time'
+    )
+    for user_id, course_id, lesson_id, status, study_time in rows.iterator(chunk_size=2000):
+        rollup = rollups.get((user_id, course_id))
+        if rollup is None:
+            rollup = rollups[(user_id, course_id)] = CourseProgress(user_id=user_id, course_id=course_id)
+        rollup.completed_count += status == 'completed'
+        rollup.total_study_time += study_time
+        rollup.last_lesson_id = lesson_id
+    return list(rollups.values())
+
+
+def apply_course_deltas(user, deltas):
+    """
+    按增量更新课程汇总, 需要在写入课时进度的同一事务中、写入之后调用
+    汇总记录不存在时按(已写入的)课时进度计算后插入;
+    并发的第一次写入可能同时插入同一条汇总, 先提交的一方计算时看不到另一方的课时进度,
+    插入失败的一方改为按增量更新, 两边的进度都会计入
+    :param deltas: {course_id: {'completed', 'study_time', 'last_lesson'}}
+    """
+    existing = set(CourseProgress.objects.filter(
+        user=user, course_id__in=deltas
+    ).values_list('course_id', flat=True))
+    missing = [course_id for course_id in deltas if course_id not in existing]
+    inserted = set()
+    if missing:
+        rollups = compute_course_progress(UserProgress.objects.filter(user=user, lesson__course_id__in=missing))
+        for rollup in rollups:
+            # 逐条插入(保存点), 才能知道哪些插入因唯一约束冲突而失败
+            try:
+                with transaction.atomic():
+                    rollup.save(force_insert=True)
+            except IntegrityError:
+                continue
+            inserted.add(rollup.course_id)
+    present = {course_id: delta for course_id, delta in deltas.items() if course_id not in inserted}
+    if not present:
+        return
+
+    def by_course(field):
+        return {course_id: delta[field] for course_id, delta in present.items()}
+
+    CourseProgress.objects.filter(user=user, course_id__in=present).update(
+        completed_count=F('completed_count') + _case(by_course('completed'), IntegerField(), 0, 'course_id'),
+        total_study_time=F('total_study_time') + _case(by_course('study_time'), IntegerField(), 0, 'course_id'),
+        last_lesson_id=Case(
+            *[When(course_id=course_id, then=Value(delta['last_lesson'])) for course_id, delta in present.items()],
+            default=F('last_lesson_id'),
+            output_field=IntegerField(),
+        ),
+        updated_at=Value(timezone.now()),
+    )
+
+
+def refresh_course_progress(user, course_ids):
+    """按现有课时进度重新计算用户的课程汇总(课时进度被直接修改或删除时使用)"""
+    with transaction.atomic():
+        CourseProgress.objects.filter(user=user, course_id__in=course_ids).delete()
+        CourseProgress.objects.bulk_create(compute_course_progress(
+            UserProgress.objects.filter(user=user, lesson__course_id__in=course_ids)
+        ))
+
+
+def published_lesson_counts():
+    """各课程已发布的课时数 {course_id: 数量}(随内容版本号失效)"""
+    def build():
+        return dict(Course.objects.annotate(
+            total=Count('lessons', filter=Q(lessons__is_published=True))
+        ).values_list('pk', 'total'))
+    return get_or_build(content_key('lesson_counts'), build)
+
+
+def course_progress_for(user, course_id):
+    """用户在课程上的学习进度汇总(未登录或没有记录时为 None)"""
+    if not user.is_authenticated:
+        return None
+    progress = CourseProgress.objects.filter(user=user, course_id=course_id).values(
+        'completed_count', 'total_study_time', 'last_lesson__slug', 'updated_at'
+    ).first()
+    if progress:
+        total = published_lesson_counts().get(course_id, 0)
+        progress['total_lessons'] = total
+        progress['completion_rate'] = min(100.0, round(progress['completed_count'] / total * 100, 2)) if total else 0
+    return progress
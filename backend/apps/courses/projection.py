@@ -0,0 +1,104 @@
+"""
+查询列裁剪
+根据序列化器声明的字段推导 only()/select_related()/Prefetch, 列表接口不再读取
+正文、参考解答等大字段
+
+序列化器方法字段(SerializerMethodField)读取的列无法自动推导, 在 Meta 中声明:
+
+    class Meta:
+        model = Exercise
+        fields = ['id', 'title', 'tags_list']
+        projection_fields = ['tags']
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _add_path(model, attrs, columns, related):
+    """把 source 路径(可跨外键)转换为 only() 列名, 途经的外键记入 select_related"""
+    prefix = []
+    for index, attr in enumerate(attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            # 模型属性或查询注解, 不对应数据库列
+            return
+        if not field.concrete or field.many_to_many:
+            return
+        columns.add('__'.join(prefix + [attr]))
+        if not field.is_relation or index == len(attrs) - 1:
+            return
+        prefix.append(attr)
+        related.add('__'.join(prefix))
+        model = field.related_model
+
+
+def serializer_projection(serializer_class, model):
+    """
+    推导序列化器需要的列
+    :return: (only 列集合, select_related 集合, [Prefetch, ...])
+    """
+    columns = {model._meta.pk.name}
+    related = set()
+    prefetches = []
+
+    meta = getattr(serializer_class, 'Meta', None)
+    for path in getattr(meta, 'projection_fields', ()):
+        _add_path(model, path.split('__'), columns, related)
+
+    for field in serializer_class().fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            prefetch = _nested_prefetch(model, field)
+            if prefetch is not None:
+                prefetches.append(prefetch)
+            continue
+        _add_path(model, field.source_attrs, columns, related)
+    return columns, related, prefetches
+
+
+def _nested_prefetch(model, field):
+    """嵌套的反向关联(如课程的课时列表)同样只读取子序列化器需要的列"""
+    try:
+        relation = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        return None
+    if not relation.one_to_many or not isinstance(field.child, serializers.ModelSerializer):
+        return None
+    child_model = relation.related_model
+    columns, related, prefetches = serializer_projection(field.child.__class__, child_model)
+    # 预取按外键回连父对象
+    columns.add(relation.field.name)
+    queryset = child_model._default_manager.only(*columns)
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return Prefetch(field.source, queryset=queryset)
+
+
+def project_queryset(queryset, serializer_class, extra=()):
+    """按序列化器裁剪查询集的列, extra 为序列化器之外还需要读取的列"""
+    columns, related, prefetches = serializer_projection(serializer_class, queryset.model)
+    for path in extra:
+        _add_path(queryset.model, path.split('__'), columns, related)
+    # 原有的 select_related 可能包含被裁掉的外键, 重新按需设置
+    queryset = queryset.only(*columns).select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset
+
+
+class FieldProjectionMixin:
+    """视图集混入: 在列表/详情动作中按序列化器字段裁剪查询列"""
+    projection_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.projection_actions:
+            queryset = project_queryset(queryset, self.get_serializer_class())
+        return queryset
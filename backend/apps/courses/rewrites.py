@@ -0,0 +1,93 @@
+"""
+课时内容批量改写
+用 @register 注册改写函数, 由 rewrite_lessons 命令流式遍历课时、只写回有变化的行
+
+改写函数接收一个课时对象, 返回 {字段名: 新值} (无需改写时返回 None):
+
+    @register('my_fix', fields=['content'])
+    def my_fix(lesson):
+        return {'content': lesson.content.replace('旧', '新')}
+"""
+import re
+
+from .assets import rewrite_asset_urls
+from .images import rewrite_img_tags
+
+
+class LessonRewrite:
+    """已注册的改写"""
+
+    def __init__(self, name, func, fields, reads=(), description=''):
+        self.name = name
+        self.func = func
+        self.fields = list(fields)
+        self.reads = list(reads)
+        self.description = description
+
+    def __call__(self, lesson):
+        return self.func(lesson)
+
+
+_registry = {}
+
+
+def register(name, fields, reads=(), description=''):
+    """
+    注册改写函数
+    :param name: 改写名称(命令行参数)
+    :param fields: 会写回的课时字段
+    :param reads: 额外需要读取的字段, 可以跨关联, 例如 course__slug
+    :param description: 说明, 默认取函数文档
+    """
+    def decorator(func):
+        _registry[name] = LessonRewrite(
+            name, func, fields, reads,
+            description or (func.__doc__ or '').strip()
+        )
+        return func
+    return decorator
+
+
+def get_rewrite(name):
+    return _registry[name]
+
+
+def all_rewrites():
+    return dict(_registry)
+
+
+# 课程 slug 到文件夹名的映射
+COURSE_FOLDERS = {
+    'day0120': 'Day01-20',
+    'day2130': 'Day21-30',
+    'day3135': 'Day31-35',
+    'day3645': 'Day36-45',
+    'day4660': 'Day46-60',
+    'day6165': 'Day61-65',
+    'day6680': 'Day66-80',
+    'day8190': 'Day81-90',
+    'day91100': 'Day91-100',
+}
+
+_WRONG_RESOURCE_PREFIX = re.compile(r'/course-res/course_resources/')
+
+
+@register('fix_image_paths', fields=['content'], reads=['course__slug'])
+def fix_image_paths(lesson):
+    """将错误的 /course-res/course_resources/ 路径修正为 /course-res/{课程目录}/"""
+    folder = COURSE_FOLDERS.get(lesson.course.slug)
+    if not folder or '/course-res/course_resources/' not in lesson.content:
+        return None
+    return {'content': _WRONG_RESOURCE_PREFIX.sub(f'/course-res/{folder}/', lesson.content)}
+
+
+@register('lesson_slugs', fields=['slug'], reads=['day_number', 'course__slug'])
+def lesson_slugs(lesson):
+    """生成唯一的slug: 课程slug-day编号, 例如 day0120-01"""
+    return {'slug': f"{lesson.course.slug}-day{lesson.day_number:02d}"}
+
+
+@register('responsive_images', fields=['content'])
+def responsive_images(lesson):
+    """按最新的图片衍生文件与资源清单改写图片和资源链接(无需重新导入; 已改写过的链接也会更新)"""
+    return {'content': rewrite_asset_urls(rewrite_img_tags(lesson.content))}
@@ -0,0 +1,210 @@
+"""
+课时全文搜索
+以章节(标题切分)为文档建立倒排索引: 中文按相邻两字切分(bigram), 英文/数字按单词切分;
+查询时用 BM25 打分, 返回带高亮片段和章节锚点的结果
+
+索引由 build_search_index 命令在导入课程后生成, 保存为 gzip 压缩的 JSON 文件
+(settings.SEARCH_INDEX_PATH), 各进程按文件修改时间加载
+"""
+import gzip
+import heapq
+import html
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+from .headings import split_sections
+
+
+logger = logging.getLogger(__name__)
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+# 标题中的词按此倍数计入词频
+TITLE_WEIGHT = 3
+
+_CJK_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD = re.compile(r'[a-z0-9_]+')
+_TERM = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9_]+')
+
+# 去掉 Markdown 中不参与搜索的部分
+_MARKUP = [
+    (re.compile(r'<img[^>]*>|!\[[^\]]*\]\([^)]*\)'), ' '),   # 图片
+    (re.compile(r'\[([^\]]*)\]\([^)]*\)'), r'\1'),           # 链接保留文字
+    (re.compile(r'<[^>]+>'), ' '),                           # HTML 标签
+    (re.compile(r'^[ \t]*(```|~~~).*$', re.M), ' '),         # 代码块围栏
+    (re.compile(r'^#{1,6}[ \t]+', re.M), ''),                # 标题标记
+    (re.compile(r'[*`>|]+'), ' '),                           # 强调、引用、表格(保留代码中的下划线)
+    (re.compile(r'[ \t]+'), ' '),
+    (re.compile(r'\n{2,}'), '\n'),
+]
+
+
+def plain_text(markdown):
+    text = markdown
+    for pattern, repl in _MARKUP:
+        text = pattern.sub(repl, text)
+    return text.strip()
+
+
+def tokenize(text):
+    """中文 bigram(单字词保留单字) + 英文单词"""
+    text = text.lower()
+    tokens = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_terms(query):
+    """查询中的原始词(用于高亮)"""
+    return [term for term in _TERM.findall(query.lower()) if term]
+
+
+def build_index(lessons):
+    """
+    为课时建立索引
+    :param lessons: 可迭代的课时对象(需要 id/slug/title/content/course.title/course.slug)
+    """
+    docs = []
+    texts = []
+    postings = {}
+    total_length = 0
+
+    for lesson in lessons:
+        for section in split_sections(lesson.content):
+            text = plain_text(lesson.content[section['start']:section['end']])
+            if not text:
+                continue
+            counts = Counter(tokenize(text))
+            for token in tokenize(f"{lesson.title} {section['title']}"):
+                counts[token] += TITLE_WEIGHT
+            length = sum(counts.values())
+            doc_id = len(docs)
+            docs.append([
+                lesson.id, lesson.slug, lesson.title, lesson.course.slug, lesson.course.title,
+                section['title'], section['anchor'], length,
+            ])
+            texts.append(text)
+            total_length += length
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append([doc_id, tf])
+
+    return {
+        'docs': docs,
+        'texts': texts,
+        'postings': postings,
+        'avgdl': total_length / len(docs) if docs else 0,
+    }
+
+
+def get_index_path():
+    return Path(settings.SEARCH_INDEX_PATH)
+
+
+def save_index(index):
+    """原子地写入索引文件"""
+    path = get_index_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+_loaded = {'mtime': None, 'index': None}
+_load_lock = threading.Lock()
+
+
+def load_index():
+    """加载索引(文件未变化时使用已加载的副本)"""
+    path = get_index_path()
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _loaded['mtime'] != mtime:
+        with _load_lock:
+            if _loaded['mtime'] != mtime:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    _loaded['index'] = json.load(f)
+                _loaded['mtime'] = mtime
+    return _loaded['index']
+
+
+def make_snippet(text, terms, width=60):
+    """截取第一个匹配词附近的文字, HTML 转义后用 <mark> 高亮匹配词"""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    first = min(positions) if positions else 0
+    start = max(0, first - width // 2)
+    end = min(len(text), start + width * 2)
+    snippet = text[start:end].replace('\n', ' ')
+    escaped = html.escape(snippet)
+    if terms:
+        pattern = re.compile('|'.join(re.escape(html.escape(t)) for t in sorted(terms, key=len, reverse=True)), re.I)
+        escaped = pattern.sub(lambda m: f'<mark>{m.group(0)}</mark>', escaped)
+    return f"{'…' if start > 0 else ''}{escaped}{'…' if end < len(text) else ''}"
+
+
+def search(query, limit=20, course=None, index=None):
+    """
+    搜索课时内容
+    :param course: 只搜索指定课程(slug)
+    :return: [{'lesson_id', 'lesson_slug', 'lesson_title', 'course_slug', 'course_title',
+               'section', 'anchor', 'score', 'snippet'}, ...]
+    """
+    index = index if index is not None else load_index()
+    if not index:
+        logger.warning('搜索索引不存在, 请运行 build_search_index')
+        return []
+    tokens = set(tokenize(query))
+    if not tokens:
+        return []
+
+    docs = index['docs']
+    postings = index['postings']
+    avgdl = index['avgdl'] or 1
+    total = len(docs)
+    scores = {}
+    for token in tokens:
+        entries = postings.get(token)
+        if not entries:
+            continue
+        idf = math.log(1 + (total - len(entries) + 0.5) / (len(entries) + 0.5))
+        for doc_id, tf in entries:
+            length = docs[doc_id][7]
+            score = idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avgdl))
+            scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+    if course:
+        scores = {doc_id: score for doc_id, score in scores.items() if docs[doc_id][3] == course}
+
+    terms = query_terms(query)
+    results = []
+    for doc_id, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+        lesson_id, lesson_slug, lesson_title, course_slug, course_title, section, anchor, _ = docs[doc_id]
+        results.append({
+            'lesson_id': lesson_id,
+            'lesson_slug': lesson_slug,
+            'lesson_title': lesson_title,
+            'course_slug': course_slug,
+            'course_title': course_title,
+            'section': section,
+            'anchor': anchor,
+            'score': round(score, 4),
+            'snippet': make_snippet(index['texts'][doc_id], terms),
+        })
+    return results
@@ -0,0 +1,78 @@
+"""
+课时章节
+导入或修改课时内容时按标题切分并保存章节位置, 详情接口可以只返回目录和开头部分,
+其余章节按锚点单独获取(数据库中用 SUBSTR 截取, 不读取整篇正文)
+"""
+from django.db import transaction
+from django.db.models import F, Subquery
+from django.db.models.functions import Substr
+
+from .headings import split_sections
+from .models import Lesson, LessonSection
+
+
+# 懒加载时首次返回的最少字符数(不足时连同后续章节一起返回)
+LAZY_INITIAL_CHARS = 4000
+
+
+def build_sections(lesson):
+    """切分课时内容, 返回未保存的章节对象"""
+    return [
+        LessonSection(
+            lesson_id=lesson.pk,
+            order=order,
+            level=section['level'],
+            title=section['title'][:200],
+            anchor=section['anchor'][:200],
+            start=section['start'],
+            end=section['end'],
+        )
+        for order, section in enumerate(split_sections(lesson.content))
+    ]
+
+
+def sync_sections(lessons):
+    """重建课时的章节记录"""
+    lessons = list(lessons)
+    sections = [section for lesson in lessons for section in build_sections(lesson)]
+    with transaction.atomic():
+        LessonSection.objects.filter(lesson_id__in=[lesson.pk for lesson in lessons]).delete()
+        LessonSection.objects.bulk_create(sections)
+    return len(sections)
+
+
+def table_of_contents(lesson_id):
+    """章节目录"""
+    return [
+        {
+            'order': section['order'],
+            'level': section['level'],
+            'title': section['title'],
+            'anchor': section['anchor'],
+            'length': section['end'] - section['start'],
+        }
+        for section in LessonSection.objects.filter(lesson_id=lesson_id).values(
+            'order', 'level', 'title', 'anchor', 'start', 'end'
+        )
+    ]
+
+
+def lesson_excerpt(lesson_id, last_order):
+    """
+    课时正文的开头部分, 截至第 last_order 个章节的结尾
+    第一个标题之前没有内容时不记录该章节, 章节长度之和会小于结尾位置, 所以按结尾位置截取
+    """
+    end = LessonSection.objects.filter(lesson_id=lesson_id, order=last_order).values('end')[:1]
+    return Lesson.objects.filter(pk=lesson_id).annotate(
+        excerpt=Substr('content', 1, Subquery(end))
+    ).values_list('excerpt', flat=True).first() or ''
+
+
+def section_content(lesson_slug, anchor):
+    """按锚点获取章节内容, 找不到时返回 None"""
+    return LessonSection.objects.filter(
+        lesson__slug=lesson_slug, lesson__is_published=True, anchor=anchor
+    ).annotate(
+        # SUBSTR 的位置从1开始
+        content=Substr('lesson__content', F('start') + 1, F('end') - F('start'))
+    ).values('order', 'level', 'title', 'anchor', 'content').first()
@@ -1,20 +1,19 @@
 from rest_framework import serializers
+from django.urls import reverse
 from .models import (
-    CourseCategory, Course, Lesson, LessonResource, UserProgress, UserNote,
+    CourseCategory, Course, Lesson, LessonResource, UserProgress, CourseProgress, UserNote,
     AIConfig, ChatHistory
 )
 
 
 class CourseCategorySerializer(serializers.ModelSerializer):
     """课程分类序列化器"""
-    courses_count = serializers.SerializerMethodField()
+    # 由视图集查询时注解, 避免每行一次COUNT
+    courses_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = CourseCategory
         fields = ['id', 'name', 'slug', 'description', 'order', 'courses_count', 'created_at']
-    
-    def get_courses_count(self, obj):
-        return obj.courses.filter(is_published=True).count()
 
 
 class LessonListSerializer(serializers.ModelSerializer):
@@ -27,7 +26,8 @@ class LessonListSerializer(serializers.ModelSerializer):
 class CourseListSerializer(serializers.ModelSerializer):
     """课程列表序列化器"""
     category_name = serializers.CharField(source='category.name', read_only=True)
-    lessons_count = serializers.SerializerMethodField()
+    # 由视图集查询时注解, 避免每行一次COUNT
+    lessons_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Course
@@ -36,14 +36,11 @@ class CourseListSerializer(serializers.ModelSerializer):
             'difficulty', 'category_name', 'lessons_count', 'view_count', 'like_count',
             'created_at', 'updated_at'
         ]
-    
-    def get_lessons_count(self, obj):
-        return obj.lessons.filter(is_published=True).count()
 
 
 class CourseDetailSerializer(serializers.ModelSerializer):
     """课程详情序列化器"""
-    category = CourseCategorySerializer(read_only=True)
+    category = serializers.SerializerMethodField()
     lessons = LessonListSerializer(many=True, read_only=True)
     
     class Meta:
@@ -53,13 +50,25 @@ class CourseDetailSerializer(serializers.ModelSerializer):
             'difficulty', 'category', 'lessons', 'view_count', 'like_count',
             'created_at', 'updated_at'
         ]
+        projection_fields = [f'category__{name}' for name in CourseCategorySerializer.Meta.fields]
+    
+    def get_category(self, obj):
+        # 分类的课程数由视图集查询时以 category_courses_count 注解在课程上
+        obj.category.courses_count = obj.category_courses_count
+        return CourseCategorySerializer(obj.category, context=self.context).data
 
 
 class LessonResourceSerializer(serializers.ModelSerializer):
     """课程资源序列化器"""
+    download_url = serializers.SerializerMethodField()
+    
     class Meta:
         model = LessonResource
-        fields = ['id', 'title', 'file', 'file_type', 'file_size', 'download_count', 'created_at']
+        fields = ['id', 'title', 'file', 'file_type', 'file_size', 'download_count', 'download_url', 'created_at']
+    
+    def get_download_url(self, obj):
+        # 相对路径, 可以放进所有用户共享的缓存
+        return reverse('resource-download', args=[obj.pk])
 
 
 class LessonDetailSerializer(serializers.ModelSerializer):
@@ -74,23 +83,30 @@ class LessonDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'day_number', 'title', 'slug', 'content', 'summary',
             'code_url', 'video_url', 'estimated_time', 'course_title', 'course_slug',
-            'resources', 'user_progress', 'view_count', 'like_count',
+            'resources', 'user_progress', 'view_count', 'like_count', 'public_note_count',
             'created_at', 'updated_at'
         ]
     
+    PROGRESS_FIELDS = ('status', 'progress_percentage', 'study_time')
+    
     def get_user_progress(self, obj):
+        # 生成共享缓存数据时不包含当前用户的进度, 由视图在读取缓存后合并
+        if self.context.get('shared'):
+            return None
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                progress = UserProgress.objects.get(user=request.user, lesson=obj)
-                return {
-                    'status': progress.status,
-                    'progress_percentage': progress.progress_percentage,
-                    'study_time': progress.study_time
-                }
-            except UserProgress.DoesNotExist:
-                return None
+        if request:
+            return self.progress_for(request.user, obj.pk)
         return None
+    
+    @classmethod
+    def progress_for(cls, user, lesson_id):
+        """用户在课时上的学习进度"""
+        if not user.is_authenticated:
+            return None
+        progress = UserProgress.objects.filter(user=user, lesson_id=lesson_id).values(
+            *cls.PROGRESS_FIELDS
+        ).first()
+        return progress
 
 
 class UserProgressSerializer(serializers.ModelSerializer):
@@ -109,6 +125,46 @@ class UserProgressSerializer(serializers.ModelSerializer):
         read_only_fields = ['user']
 
 
+class CourseProgressSerializer(serializers.ModelSerializer):
+    """课程学习进度汇总序列化器"""
+    course_slug = serializers.CharField(source='course.slug', read_only=True)
+    course_title = serializers.CharField(source='course.title', read_only=True)
+    last_lesson_slug = serializers.CharField(source='last_lesson.slug', read_only=True, default=None)
+    last_lesson_title = serializers.CharField(source='last_lesson.title', read_only=True, default=None)
+    total_lessons = serializers.SerializerMethodField()
+    completion_rate = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = CourseProgress
+        fields = [
+            'course', 'course_slug', 'course_title', 'completed_count', 'total_lessons',
+            'completion_rate', 'total_study_time', 'last_lesson', 'last_lesson_slug',
+            'last_lesson_title', 'updated_at'
+        ]
+    
+    def get_total_lessons(self, obj):
+        # 视图在上下文中传入各课程的课时数(published_lesson_counts)
+        return self.context.get('lesson_counts', {}).get(obj.course_id, 0)
+    
+    def get_completion_rate(self, obj):
+        total = self.get_total_lessons(obj)
+        return min(100.0, round(obj.completed_count / total * 100, 2)) if total else 0
+
+
+class ProgressEventSerializer(serializers.Serializer):
+    """学习进度心跳中的一条事件"""
+    lesson_id = serializers.IntegerField(min_value=1)
+    progress_percentage = serializers.IntegerField(min_value=0, max_value=100, default=0)
+    # 距上一次心跳新增的学习时长(分钟)
+    study_time = serializers.IntegerField(min_value=0, max_value=60, default=0)
+    timestamp = serializers.DateTimeField(required=False)
+
+
+class ProgressHeartbeatSerializer(serializers.Serializer):
+    """批量学习进度心跳"""
+    events = ProgressEventSerializer(many=True, allow_empty=False, max_length=500)
+
+
 class UserNoteSerializer(serializers.ModelSerializer):
     """学习笔记序列化器"""
     username = serializers.CharField(source='user.username', read_only=True)
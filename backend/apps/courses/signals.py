@@ -0,0 +1,28 @@
+"""
+课程内容变化时使内容缓存失效, 课时内容变化时重建章节
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_content_version
+from .models import Course, CourseCategory, Lesson, LessonResource
+from .sections import sync_sections
+
+
+CONTENT_MODELS = (CourseCategory, Course, Lesson, LessonResource)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_content_cache(sender, **kwargs):
+    if sender in CONTENT_MODELS:
+        bump_content_version()
+
+
+@receiver(post_save, sender=Lesson)
+def rebuild_lesson_sections(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'content' not in update_fields:
+        return
+    if 'content' in instance.get_deferred_fields():
+        return
+    sync_sections([instance])
@@ -0,0 +1,14 @@
+"""
+Server-Sent Events
+把事件编码为 text/event-stream 格式
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def sse_event(data, event=None):
+    """编码一个事件(data 为 JSON)"""
+    payload = json.dumps(data, ensure_ascii=False, cls=DjangoJSONEncoder)
+    prefix = f'event: {event}\n' if event else ''
+    return f'{prefix}data: {payload}\n\n'.encode()
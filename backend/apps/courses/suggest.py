@@ -0,0 +1,122 @@
+"""
+标题自动补全
+课程、课时、练习题的标题和标签放入内存中的有序数组, 用 bisect 做前缀查找;
+中文标题同时生成拼音首字母和全拼键(安装了 pypinyin 时)
+内容版本号变化或超过 SUGGEST_MAX_AGE 秒后重建(练习题的变化不触发内容版本号)
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from apps.exercises.models import Exercise
+
+from .cache import get_content_version
+from .models import Course, Lesson
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # pypinyin 为可选依赖, 未安装时不支持拼音
+    lazy_pinyin = None
+
+
+SUGGEST_MAX_AGE = 300
+
+# 补全结果的类型排序: 课程 > 课时 > 练习题
+KIND_ORDER = {'course': 0, 'lesson': 1, 'exercise': 2}
+
+# 词的起始位置: 英文单词或任意一个汉字
+_WORD_START = re.compile(r'[a-z0-9]+|[\u4e00-\u9fff]')
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+
+
+def make_keys(text):
+    """
+    生成补全键: 从每个词(汉字)开始的后缀, 以及对应的拼音首字母/全拼后缀
+    返回 {键: 是否从标题开头匹配}
+    """
+    text = text.strip()
+    lowered = text.lower()
+    keys = {}
+    for match in _WORD_START.finditer(lowered):
+        keys.setdefault(lowered[match.start():], match.start() == 0)
+    if lazy_pinyin is not None and re.search(r'[\u4e00-\u9fff]', text):
+        for style in (Style.FIRST_LETTER, Style.NORMAL):
+            # 每个汉字(词)开始的拼音后缀, 例如 "数据结构" -> sjjg, jjg, ...
+            syllables = [_NON_ALNUM.sub('', part.lower()) for part in lazy_pinyin(text, style=style)]
+            for index, syllable in enumerate(syllables):
+                if syllable:
+                    keys.setdefault(''.join(syllables[index:]), index == 0)
+    return keys
+
+
+class SuggestIndex:
+    """有序数组前缀索引"""
+
+    def __init__(self, items):
+        """
+        :param items: [{'type', 'title', 'slug', ...}, ...]
+        """
+        self.items = items
+        pairs = []
+        for item_id, item in enumerate(items):
+            texts = [item['title']] + item.pop('tags', [])
+            for text in texts:
+                for key, from_start in make_keys(text).items():
+                    pairs.append((key, item_id, from_start))
+        pairs.sort()
+        self.keys = [key for key, _, _ in pairs]
+        self.entries = [(item_id, from_start) for _, item_id, from_start in pairs]
+
+    def lookup(self, prefix, limit=10, scan=200):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        best = {}
+        position = bisect_left(self.keys, prefix)
+        end = min(len(self.keys), position + scan)
+        while position < end and self.keys[position].startswith(prefix):
+            item_id, from_start = self.entries[position]
+            item = self.items[item_id]
+            rank = (not from_start, KIND_ORDER[item['type']], len(item['title']))
+            if item_id not in best or rank < best[item_id]:
+                best[item_id] = rank
+            position += 1
+        ranked = sorted(best, key=lambda item_id: best[item_id])[:limit]
+        return [self.items[item_id] for item_id in ranked]
+
+
+def build_suggest_index():
+    items = []
+    for title, slug in Course.objects.filter(is_published=True).values_list('title', 'slug'):
+        items.append({'type': 'course', 'title': title, 'slug': slug})
+    for title, slug, course_slug in Lesson.objects.filter(is_published=True).values_list(
+        'title', 'slug', 'course__slug'
+    ):
+        items.append({'type': 'lesson', 'title': title, 'slug': slug, 'course_slug': course_slug})
+    for title, slug, tags in Exercise.objects.values_list('title', 'slug', 'tags'):
+        items.append({
+            'type': 'exercise', 'title': title, 'slug': slug,
+            'tags': [tag.strip() for tag in tags.split(',') if tag.strip()],
+        })
+    return SuggestIndex(items)
+
+
+_current = {'version': None, 'built_at': 0.0, 'index': None}
+_build_lock = threading.Lock()
+
+
+def get_suggest_index():
+    """当前进程中的索引, 过期时重建"""
+    version = get_content_version()
+    if _current['version'] != version or time.monotonic() - _current['built_at'] > SUGGEST_MAX_AGE:
+        with _build_lock:
+            if _current['version'] != version or time.monotonic() - _current['built_at'] > SUGGEST_MAX_AGE:
+                _current['index'] = build_suggest_index()
+                _current['version'] = version
+                _current['built_at'] = time.monotonic()
+    return _current['index']
+
+
+def suggest(prefix, limit=10):
+    return get_suggest_index().lookup(prefix, limit=limit)
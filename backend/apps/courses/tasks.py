@@ -0,0 +1,34 @@
+"""
+课程相关的 Celery 任务
+"""
+import logging
+
+from celery import shared_task
+
+from . import counters
+from .chat_context import fold_history, release_summary
+from .models import AIConfig
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def flush_counters():
+    """把 Redis 中缓冲的浏览/点赞计数批量写回数据库"""
+    flushed = counters.flush_all()
+    if any(flushed.values()):
+        logger.info('计数写回完成: %s', flushed)
+
+
+@shared_task(ignore_result=True)
+def summarize_chat_session(user_id, session_id):
+    """把会话中超出上下文预算的较早消息合并进滚动摘要"""
+    try:
+        config = AIConfig.objects.filter(user_id=user_id, is_active=True).first()
+        if config and fold_history(config, session_id):
+            logger.info('对话摘要已更新: %s %s', user_id, session_id)
+    except Exception as e:
+        logger.warning('对话摘要失败: %s', e)
+    finally:
+        release_summary(user_id, session_id)
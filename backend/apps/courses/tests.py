@@ -0,0 +1,267 @@
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_started
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from config import asgi, settings_asgi
+
+from . import progress
+from .assets import asset_copies_root, rewrite_asset_urls, sync_asset_copies
+from .images import file_digest, rewrite_img_tags
+from .models import Course, CourseCategory, CourseProgress, Lesson, UserProgress
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CountAnnotationQueryTests(TestCase):
+    """分类课程数、课程课时数由查询注解得出, 列表的查询次数不随行数增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = []
+        for i in range(5):
+            # 排序与创建顺序相反, 用来检查列表按 order 排序
+            category = CourseCategory.objects.create(name=f'分类{i}', slug=f'category-{i}', order=10 - i)
+            cls.categories.append(category)
+            for j in range(3):
+                course = Course.objects.create(
+                    category=category,
+                    title=f'课程{i}-{j}',
+                    slug=f'course-{i}-{j}',
+                    description='课程描述',
+                    day_range='Day01-20',
+                    order=(5 - i) * 10 + j,
+                    # 未发布的课程不计入分类的课程数
+                    is_published=j < 2,
+                )
+                for day in range(1, 4):
+                    Lesson.objects.create(
+                        course=course,
+                        day_number=day,
+                        title=f'第{day}天',
+                        slug=f'day-{day}',
+                        content='内容',
+                        is_published=day < 3,
+                    )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_category_list(self):
+        # ETag 校验 + 分页总数 + 当前页
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/courses/categories/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['slug'] for item in response.data['results']],
+            [f'category-{i}' for i in reversed(range(5))]
+        )
+        self.assertEqual({item['courses_count'] for item in response.data['results']}, {2})
+
+    def test_category_list_does_not_grow_with_rows(self):
+        CourseCategory.objects.create(name='空分类', slug='empty', order=0)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/courses/categories/')
+        slugs = [item['slug'] for item in response.data['results']]
+        self.assertEqual(slugs, ['empty'] + [f'category-{i}' for i in reversed(range(5))])
+        self.assertEqual(response.data['results'][0]['courses_count'], 0)
+
+    def test_course_list(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/courses/courses/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(
+            [item['slug'] for item in response.data['results']],
+            [f'course-{i}-{j}' for i in reversed(range(5)) for j in range(2)]
+        )
+        self.assertEqual({item['lessons_count'] for item in response.data['results']}, {2})
+
+
+class CourseProgressRaceTests(TestCase):
+    """并发的第一次写入同时插入课程汇总时, 插入失败的一方按增量更新, 不丢进度"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('learner', password='secret')
+        category = CourseCategory.objects.create(name='分类', slug='category')
+        cls.course = Course.objects.create(
+            category=category, title='课程', slug='course', description='课程描述', day_range='Day01-20'
+        )
+        cls.lessons = [
+            Lesson.objects.create(course=cls.course, day_number=day, title=f'第{day}天', slug=f'day-{day}', content='内容')
+            for day in (1, 2)
+        ]
+
+    def test_lost_insert_applies_delta(self):
+        first, second = self.lessons
+        compute = progress.compute_course_progress
+
+        def compute_after_other_writer(queryset):
+            # 模拟另一个请求在存在性检查之后先插入了汇总: 它只算进了自己的课时(第一天)
+            rollups = compute(queryset)
+            CourseProgress.objects.create(
+                user=self.user, course=self.course, completed_count=1, total_study_time=5, last_lesson=first
+            )
+            return rollups
+
+        UserProgress.objects.create(user=self.user, lesson=first, status='completed', study_time=5)
+        with mock.patch.object(progress, 'compute_course_progress', compute_after_other_writer):
+            progress.apply_heartbeat(self.user, [
+                {'lesson_id': second.pk, 'progress_percentage': 100, 'study_time': 3},
+            ])
+
+        rollup = CourseProgress.objects.get(user=self.user, course=self.course)
+        self.assertEqual(rollup.completed_count, 2)
+        self.assertEqual(rollup.total_study_time, 8)
+        self.assertEqual(rollup.last_lesson, second)
+
+
+class AssetCopiesTests(SimpleTestCase):
+    """带哈希文件名的资源副本与清单一致, nginx 可以按 URL 直接提供"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base_dir = Path(tmp.name) / 'course_resources'
+        self.image = self.base_dir / 'Day01-20' / 'res' / 'a.png'
+        self.image.parent.mkdir(parents=True)
+        self.image.write_bytes(b'v1')
+        settings_override = override_settings(COURSE_DERIVATIVES_ROOT=Path(tmp.name) / 'course_derivatives')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def manifest(self):
+        return {'Day01-20/res/a.png': {'digest': file_digest(self.image)}}
+
+    def test_copies_follow_manifest(self):
+        old = self.manifest()
+        self.assertEqual(sync_asset_copies(self.base_dir, old), (1, 0))
+        old_copy = asset_copies_root() / f"Day01-20/res/a.{old['Day01-20/res/a.png']['digest']}.png"
+        self.assertEqual(old_copy.read_bytes(), b'v1')
+        self.assertEqual(sync_asset_copies(self.base_dir, old), (0, 0))
+
+        self.image.write_bytes(b'v2')
+        new = self.manifest()
+        self.assertEqual(sync_asset_copies(self.base_dir, new), (1, 1))
+        self.assertFalse(old_copy.exists())
+        new_copy = asset_copies_root() / f"Day01-20/res/a.{new['Day01-20/res/a.png']['digest']}.png"
+        self.assertEqual(new_copy.read_bytes(), b'v2')
+
+    def test_changed_file_is_not_published(self):
+        # 计算哈希之后文件又被修改: 副本内容与哈希不一致, 不发布
+        manifest = self.manifest()
+        self.image.write_bytes(b'v2')
+        self.assertEqual(sync_asset_copies(self.base_dir, manifest), (0, 0))
+        self.assertEqual(list(asset_copies_root().rglob('*.png')), [])
+
+
+def image_entry(digest):
+    """Day01-20/res/a.png 的衍生文件清单条目"""
+    return {
+        'digest': digest,
+        'width': 1000,
+        'height': 500,
+        'variants': [{
+            'width': width,
+            'height': width // 2,
+            'webp': f'Day01-20/res/a-{width}w.{digest}.webp',
+            'fallback': f'Day01-20/res/a-{width}w.{digest}.png',
+        } for width in (320, 640)],
+    }
+
+
+class ResponsiveImageRewriteTests(SimpleTestCase):
+    """改写过的内容按新的清单再次改写, 结果与从原始内容改写相同"""
+
+    original = '![示意图](/course-res/Day01-20/res/a.png) <img src="/course-res/Day01-20/res/a.png" alt="图">'
+
+    def test_rewrite_follows_new_manifest(self):
+        old = {'Day01-20/res/a.png': image_entry('0' * 12)}
+        new = {'Day01-20/res/a.png': image_entry('1' * 12)}
+        rewritten = rewrite_img_tags(self.original, old)
+        self.assertIn('a-640w.000000000000.png', rewritten)
+
+        again = rewrite_img_tags(rewritten, new)
+        self.assertEqual(again, rewrite_img_tags(self.original, new))
+        self.assertNotIn('000000000000', again)
+        self.assertEqual(rewrite_img_tags(again, new), again)
+
+    def test_hashed_resource_links_follow_new_manifest(self):
+        content = '[代码](/course-res/Day01-20/res/a.py)'
+        old = rewrite_asset_urls(content, {'Day01-20/res/a.py': {'digest': '0' * 12}})
+        self.assertIn('/course-res/Day01-20/res/a.000000000000.py', old)
+        new = rewrite_asset_urls(old, {'Day01-20/res/a.py': {'digest': '1' * 12}})
+        self.assertEqual(new, '[代码](/course-res/Day01-20/res/a.111111111111.py)')
+
+
+class AsgiProcessTests(SimpleTestCase):
+    """
+    ASGI 进程中进行中的请求不占用线程:
+    中间件都支持异步, 加载时不需要适配(有一个需要适配, 整条链就会在线程中执行);
+    请求中的同步调用都在共用的上下文(同一个线程)中执行, 不为每个请求新建线程
+    """
+
+    @override_settings(DEBUG=True, MIDDLEWARE=settings_asgi.MIDDLEWARE)
+    def test_asgi_middleware_is_not_adapted(self):
+        # DEBUG 时 Django 对每个适配的中间件记录一条 django.request 的 DEBUG 日志
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler().load_middleware(is_async=True)
+
+    @override_settings(DEBUG=True)
+    def test_wsgi_middleware_is_adapted(self):
+        # 对照: WSGI 进程的中间件(含 WhiteNoise)在 ASGI 下需要适配
+        self.assertIn('whitenoise.middleware.WhiteNoiseMiddleware', settings.MIDDLEWARE)
+        with self.assertLogs('django.request', 'DEBUG'):
+            ASGIHandler().load_middleware(is_async=True)
+
+    async def _request_contexts(self, handler, count=3):
+        """并发发出几个请求, 返回各请求 request_started 信号所在的 (线程, 同步调用上下文)"""
+        seen = []
+
+        def record(**kwargs):
+            seen.append((threading.get_ident(), SyncToAsync.thread_sensitive_context.get()))
+
+        async def request():
+            scope = {'type': 'http', 'method': 'GET', 'path': '/__missing__/', 'query_string': b'', 'headers': []}
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            await handler(scope, receive, send)
+            return messages
+
+        request_started.connect(record)
+        try:
+            with self.assertLogs('django.request', 'WARNING'):
+                responses = await asyncio.gather(*(request() for _ in range(count)))
+        finally:
+            request_started.disconnect(record)
+        self.assertTrue(all(messages[0]['type'] == 'http.response.start' for messages in responses))
+        return seen
+
+    async def test_requests_share_one_sync_context(self):
+        seen = await self._request_contexts(asgi.application)
+        self.assertEqual(len(seen), 3)
+        self.assertEqual({context for _, context in seen}, {asgi.shared_context})
+        self.assertEqual(len({thread for thread, _ in seen}), 1)
+
+    async def test_stock_handler_uses_a_context_per_request(self):
+        # 对照: Django 默认的 ASGIHandler 为每个请求新建上下文(及线程)
+        seen = await self._request_contexts(ASGIHandler())
+        self.assertEqual(len({context for _, context in seen}), 3)
@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CourseCategoryViewSet, CourseViewSet, LessonViewSet,
     UserProgressViewSet, UserNoteViewSet,
-    AIConfigViewSet, ChatViewSet
+    AIConfigViewSet, ChatViewSet, catalog, resource_download, search, suggest
 )
+from .async_views import ai_config_models, ai_config_test, chat_send, chat_stream
 
 router = DefaultRouter()
 router.register('categories', CourseCategoryViewSet, basename='category')
@@ -16,5 +17,14 @@ router.register('ai-config', AIConfigViewSet, basename='ai-config')
 router.register('chat', ChatViewSet, basename='chat')
 
 urlpatterns = [
+    path('catalog/', catalog, name='catalog'),
+    path('search/', search, name='search'),
+    path('suggest/', suggest, name='suggest'),
+    path('resources/<int:pk>/download/', resource_download, name='resource-download'),
+    # 调用AI服务的接口是异步视图, 需要注册在 router 之前
+    path('chat/send/', chat_send, name='chat-send'),
+    path('chat/stream/', chat_stream, name='chat-stream'),
+    path('ai-config/models/', ai_config_models, name='ai-config-models'),
+    path('ai-config/<int:pk>/test/', ai_config_test, name='ai-config-test'),
     path('', include(router.urls)),
 ]
@@ -1,40 +1,68 @@
 from rest_framework import viewsets, filters, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
-from django.core.cache import cache
-from django.db.models import F, Q
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated, AllowAny
+from django.db.models import F, Q, Count, FilteredRelation, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import transaction
-import uuid
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+from django.conf import settings
+from pathlib import Path
+import mimetypes
+import time
 from django.utils import timezone
-import requests
 import logging
 
+from apps.users.dashboard import get_dashboard, invalidate_dashboard
 from .models import (
-    CourseCategory, Course, Lesson, UserProgress, UserNote,
+    CourseCategory, Course, Lesson, LessonResource, UserProgress, CourseProgress, UserNote,
     AIConfig, ChatHistory
 )
 from .serializers import (
     CourseCategorySerializer, CourseListSerializer, CourseDetailSerializer,
     LessonListSerializer, LessonDetailSerializer,
-    UserProgressSerializer, UserNoteSerializer,
-    AIConfigSerializer, ChatHistorySerializer, ChatMessageSerializer
+    UserProgressSerializer, CourseProgressSerializer, ProgressHeartbeatSerializer, UserNoteSerializer,
+    AIConfigSerializer, ChatHistorySerializer
 )
-from .ai_service import AIServiceFactory
+from .assets import load_asset_manifest, split_hashed_name, accel_redirect_path, is_course_resource
+from . import counters
+from .cache import content_key, get_or_build
+from .catalog import choose_encoding, get_snapshot
+from .conditional import ConditionalGetMixin, conditional
+from .downloads import accel_response, is_first_request, ranged_file_response
+from .images import get_course_base_dir
+from .notes import adjust_public_note_counts
+from .pagination import KeysetPagination
+from .progress import (
+    apply_course_deltas, apply_heartbeat, course_progress_for, published_lesson_counts,
+    refresh_course_progress
+)
+from .projection import FieldProjectionMixin
+from .search import search as search_lessons
+from .sections import LAZY_INITIAL_CHARS, lesson_excerpt, section_content, table_of_contents
+from .suggest import suggest as suggest_titles
 
 
 logger = logging.getLogger(__name__)
 
 
-class CourseCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseCategoryViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """课程分类视图集"""
-    queryset = CourseCategory.objects.filter(is_active=True)
+    # 注解计数带 GROUP BY, Django 会忽略 Meta.ordering, 需要显式排序
+    queryset = CourseCategory.objects.filter(is_active=True).annotate(
+        courses_count=Count('courses', filter=Q(courses__is_published=True))
+    ).order_by('order', 'id')
     serializer_class = CourseCategorySerializer
     lookup_field = 'slug'
 
 
-class CourseViewSet(viewsets.ReadOnlyModelViewSet):
+class CourseViewSet(ConditionalGetMixin, FieldProjectionMixin, viewsets.ReadOnlyModelViewSet):
     """课程视图集"""
     queryset = Course.objects.filter(is_published=True).select_related('category')
     lookup_field = 'slug'
@@ -43,72 +71,172 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'view_count', 'like_count']
     ordering = ['order', 'id']
+    view_counter = 'course'
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            # 详情中嵌套的分类需要该分类已发布课程数
+            category_courses = Course.objects.filter(
+                category=OuterRef('category'), is_published=True
+            ).order_by().values('category').annotate(total=Count('pk')).values('total')
+            return queryset.annotate(category_courses_count=Coalesce(Subquery(category_courses), 0))
+        return queryset.annotate(lessons_count=Count('lessons', filter=Q(lessons__is_published=True)))
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return CourseDetailSerializer
         return CourseListSerializer
     
+    def etag_annotations(self):
+        # 详情中包含当前用户的课程进度汇总
+        if not self.request.user.is_authenticated:
+            return {}
+        progress = CourseProgress.objects.filter(
+            user=self.request.user, course=OuterRef('pk')
+        ).values('updated_at')[:1]
+        return {'progress_at': Subquery(progress)}
+    
+    @conditional
     def retrieve(self, request, *args, **kwargs):
-        """获取课程详情(带缓存)"""
+        """获取课程详情(带缓存, 内容变化时自动失效)"""
         slug = kwargs.get('slug')
-        cache_key = f'course_detail_{slug}'
-        
-        # 尝试从缓存获取
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
         
-        # 增加浏览次数
-        instance = self.get_object()
-        Course.objects.filter(pk=instance.pk).update(view_count=F('view_count') + 1)
+        def build():
+            return self.get_serializer(self.get_object()).data
         
-        serializer = self.get_serializer(instance)
-        data = serializer.data
+        data = dict(get_or_build(content_key('course_detail', slug), build))
+        data['user_progress'] = course_progress_for(request.user, data['id'])
         
-        # 缓存1小时
-        cache.set(cache_key, data, 3600)
-        return Response(data)
+        # 增加浏览次数(缓冲在Redis中, 定时写回), 计数不使用缓存中的旧值
+        counters.incr('course', data['id'], 'view_count')
+        return Response(counters.overlay_counts('course', data))
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def like(self, request, slug=None):
         """点赞课程"""
         course = self.get_object()
-        Course.objects.filter(pk=course.pk).update(like_count=F('like_count') + 1)
-        return Response({'status': 'success', 'like_count': course.like_count + 1})
+        liked = counters.like('course', course.pk, request.user.pk)
+        return Response({
+            'status': 'success' if liked else 'already_liked',
+            'like_count': counters.current_count('course', course, 'like_count')
+        })
 
 
-class LessonViewSet(viewsets.ReadOnlyModelViewSet):
+class LessonViewSet(ConditionalGetMixin, FieldProjectionMixin, viewsets.ReadOnlyModelViewSet):
     """课程课时视图集"""
     queryset = Lesson.objects.filter(is_published=True).select_related('course')
     lookup_field = 'slug'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['course']
-    search_fields = ['title', 'content']
+    # 正文搜索使用 /api/courses/search/ (倒排索引), 这里只匹配标题和摘要
+    search_fields = ['title', 'summary']
     ordering_fields = ['day_number', 'created_at', 'view_count']
     ordering = ['course', 'day_number']
+    view_counter = 'lesson'
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return LessonDetailSerializer
         return LessonListSerializer
     
+    def get_etag_queryset(self):
+        queryset = super().get_etag_queryset()
+        if self.action == 'retrieve' and self.request.user.is_authenticated:
+            # 按 (user, lesson) 唯一索引 LEFT JOIN 当前用户的学习进度, 计算 ETag 时一并取回
+            queryset = queryset.alias(current_progress=FilteredRelation(
+                'user_progress', condition=Q(user_progress__user=self.request.user)
+            ))
+        return queryset
+    
+    def etag_annotations(self):
+        # 详情中包含当前用户的学习进度, 进度变化时ETag随之变化
+        if not self.request.user.is_authenticated:
+            return {}
+        annotations = {'progress_at': F('current_progress__last_accessed')}
+        for field in LessonDetailSerializer.PROGRESS_FIELDS:
+            annotations[f'progress_{field}'] = F(f'current_progress__{field}')
+        return annotations
+    
+    def current_user_progress(self, lesson_id):
+        """当前用户的学习进度: 优先使用 ETag 查询中取回的值, 没有时单独查询"""
+        values = getattr(self, '_etag_values', None)
+        if values is None or self._etag_pk != lesson_id:
+            return LessonDetailSerializer.progress_for(self.request.user, lesson_id)
+        if values.get('progress_status') is None:
+            return None
+        return {field: values[f'progress_{field}'] for field in LessonDetailSerializer.PROGRESS_FIELDS}
+    
+    @conditional
     def retrieve(self, request, *args, **kwargs):
-        """获取课时详情"""
-        instance = self.get_object()
+        """获取课时详情(带缓存, 内容变化时自动失效)"""
+        slug = kwargs.get('slug')
         
-        # 增加浏览次数
-        Lesson.objects.filter(pk=instance.pk).update(view_count=F('view_count') + 1)
+        lazy = request.query_params.get('lazy') in ('1', 'true')
         
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        def build():
+            # 缓存的是所有用户共享的数据, 不包含当前用户的学习进度
+            context = self.get_serializer_context()
+            context['shared'] = True
+            if lazy:
+                return self._build_lazy_detail(slug, context)
+            return self.get_serializer(self.get_object(), context=context).data
+        
+        cache_name = 'lesson_detail_lazy' if lazy else 'lesson_detail'
+        data = dict(get_or_build(content_key(cache_name, slug), build))
+        # 当前用户的进度不进入共享缓存, 在读取缓存后合并
+        data['user_progress'] = self.current_user_progress(data['id'])
+        
+        # 增加浏览次数(缓冲在Redis中, 定时写回), 计数不使用缓存中的旧值
+        counters.incr('lesson', data['id'], 'view_count')
+        return Response(counters.overlay_counts('lesson', data, extra=('public_note_count',)))
+    
+    def _build_lazy_detail(self, slug, context):
+        """
+        懒加载的课时详情: 正文只包含开头部分, 附带章节目录
+        sections 为目录, loaded_sections 为已包含在 content 中的章节数
+        """
+        queryset = self.filter_queryset(self.get_queryset()).defer('content')
+        lesson = get_object_or_404(queryset, **{self.lookup_field: slug})
+        toc = table_of_contents(lesson.pk)
+        if not toc:
+            # 没有章节记录(旧数据)时返回完整内容
+            lesson.refresh_from_db(fields=['content'])
+            data = self.get_serializer(lesson, context=context).data
+            data.update(sections=[], loaded_sections=0)
+            return data
+        
+        loaded, length = 0, 0
+        for section in toc:
+            loaded += 1
+            length += section['length']
+            if length >= LAZY_INITIAL_CHARS:
+                break
+        lesson.content = lesson_excerpt(lesson.pk, toc[loaded - 1]['order'])
+        data = self.get_serializer(lesson, context=context).data
+        data.update(sections=toc, loaded_sections=loaded)
+        return data
+    
+    @action(detail=True, methods=['get'], url_path=r'sections/(?P<anchor>[^/]+)')
+    def section(self, request, slug=None, anchor=None):
+        """按锚点获取课时的一个章节"""
+        data = get_or_build(
+            content_key('lesson_section', slug, anchor),
+            lambda: section_content(slug, anchor) or {}
+        )
+        if not data:
+            return Response({'error': '章节不存在'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def like(self, request, slug=None):
         """点赞课时"""
         lesson = self.get_object()
-        Lesson.objects.filter(pk=lesson.pk).update(like_count=F('like_count') + 1)
-        return Response({'status': 'success', 'like_count': lesson.like_count + 1})
+        liked = counters.like('lesson', lesson.pk, request.user.pk)
+        return Response({
+            'status': 'success' if liked else 'already_liked',
+            'like_count': counters.current_count('lesson', lesson, 'like_count')
+        })
 
 
 class UserProgressViewSet(viewsets.ModelViewSet):
@@ -123,7 +251,22 @@ class UserProgressViewSet(viewsets.ModelViewSet):
         return UserProgress.objects.filter(user=self.request.user).select_related('lesson', 'lesson__course')
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        progress = serializer.save(user=self.request.user)
+        refresh_course_progress(self.request.user, [progress.lesson.course_id])
+        invalidate_dashboard(self.request.user.pk)
+    
+    def perform_update(self, serializer):
+        course_ids = {serializer.instance.lesson.course_id}
+        progress = serializer.save()
+        course_ids.add(progress.lesson.course_id)
+        refresh_course_progress(self.request.user, course_ids)
+        invalidate_dashboard(self.request.user.pk)
+    
+    def perform_destroy(self, instance):
+        course_id = instance.lesson.course_id
+        instance.delete()
+        refresh_course_progress(self.request.user, [course_id])
+        invalidate_dashboard(self.request.user.pk)
     
     @action(detail=False, methods=['post'])
     def update_progress(self, request):
@@ -146,12 +289,22 @@ class UserProgressViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # 获取或创建进度记录
-        user_progress, created = UserProgress.objects.get_or_create(
-            user=request.user,
+        with transaction.atomic():
+            user_progress = self._save_progress(request.user, lesson, progress, study_time)
+        invalidate_dashboard(request.user.pk)
+        
+        serializer = self.get_serializer(user_progress)
+        return Response(serializer.data)
+    
+    def _save_progress(self, user, lesson, progress, study_time):
+        """写入课时进度并在同一事务中更新课程汇总"""
+        # 获取或创建进度记录(锁定, 以便得到准确的原状态)
+        user_progress, created = UserProgress.objects.select_for_update().get_or_create(
+            user=user,
             lesson=lesson,
             defaults={'status': 'in_progress'}
         )
+        was_completed = not created and user_progress.status == 'completed'
         
         # 更新进度
         user_progress.progress_percentage = progress
@@ -173,22 +326,51 @@ class UserProgressViewSet(viewsets.ModelViewSet):
                 from django.utils import timezone
                 user_progress.started_at = timezone.now()
         
-        user_progress.save()
+        # study_time 已经由上面的 F 表达式更新, 不能用内存中的旧值覆盖
+        user_progress.save(update_fields=[
+            'progress_percentage', 'status', 'started_at', 'completed_at', 'last_accessed'
+        ])
         
         # 重新获取以获得最新的study_time值
         user_progress.refresh_from_db()
         
-        serializer = self.get_serializer(user_progress)
-        return Response(serializer.data)
+        is_completed = user_progress.status == 'completed'
+        apply_course_deltas(user, {lesson.course_id: {
+            'completed': int(is_completed) - int(was_completed),
+            'study_time': study_time,
+            'last_lesson': lesson.pk,
+        }})
+        return user_progress
+    
+    @action(detail=False, methods=['get'])
+    def courses(self, request):
+        """各课程的学习进度汇总"""
+        queryset = CourseProgress.objects.filter(user=request.user).select_related('course', 'last_lesson')
+        context = self.get_serializer_context()
+        context['lesson_counts'] = published_lesson_counts()
+        return Response(CourseProgressSerializer(queryset, many=True, context=context).data)
+    
+    @action(detail=False, methods=['post'])
+    def heartbeat(self, request):
+        """
+        批量提交学习进度心跳
+        请求体: {"events": [{"lesson_id", "progress_percentage", "study_time", "timestamp"}, ...]}
+        """
+        serializer = ProgressHeartbeatSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = apply_heartbeat(request.user, serializer.validated_data['events'])
+        invalidate_dashboard(request.user.pk)
+        return Response({'updated': updated})
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """获取学习统计数据"""
-        queryset = self.get_queryset()
-        total = queryset.count()
-        completed = queryset.filter(status='completed').count()
-        in_progress = queryset.filter(status='in_progress').count()
-        total_study_time = sum(p.study_time for p in queryset)
+        # 与用户学习概览共用同一份缓存的计数
+        dashboard = get_dashboard(request.user)
+        total = dashboard['started_lessons']
+        completed = dashboard['completed_lessons']
+        in_progress = dashboard['in_progress_lessons']
+        total_study_time = dashboard['total_study_time']
         
         return Response({
             'total_lessons': total,
@@ -204,30 +386,75 @@ class UserNoteViewSet(viewsets.ModelViewSet):
     """学习笔记视图集"""
     serializer_class = UserNoteSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # 列表固定按 (created_at, id) 倒序游标翻页, 不支持 ordering 参数
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['lesson', 'is_public']
     search_fields = ['content']
-    ordering = ['-created_at']
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
+        notes = UserNote.objects.select_related('user', 'lesson')
+        if self.action in ('update', 'partial_update', 'destroy'):
+            # 只能修改和删除自己的笔记
+            return notes.filter(user=self.request.user)
         if self.request.user.is_authenticated:
             # 已登录用户可以看到自己的所有笔记和其他人的公开笔记
-            return UserNote.objects.filter(
+            return notes.filter(
                 Q(user=self.request.user) | Q(is_public=True)
-            ).select_related('user', 'lesson')
+            )
         else:
             # 未登录用户只能看公开笔记
-            return UserNote.objects.filter(is_public=True).select_related('user', 'lesson')
+            return notes.filter(is_public=True)
+    
+    def get_list_querysets(self):
+        """
+        列表中可见的笔记: 自己的笔记和公开笔记分成两个查询(各自使用索引), 结果取并集
+        user=me 时只查询自己的笔记
+        """
+        user = self.request.user
+        only_mine = self.request.query_params.get('user') == 'me'
+        if not user.is_authenticated:
+            return [] if only_mine else [UserNote.objects.filter(is_public=True)]
+        if only_mine:
+            return [UserNote.objects.filter(user=user)]
+        return [UserNote.objects.filter(user=user), UserNote.objects.filter(is_public=True)]
+    
+    def list(self, request, *args, **kwargs):
+        querysets = [self.filter_queryset(queryset) for queryset in self.get_list_querysets()]
+        page = self.paginator.paginate_union(querysets, request)
+        notes = UserNote.objects.filter(pk__in=page).select_related('user', 'lesson').in_bulk()
+        serializer = self.get_serializer([notes[pk] for pk in page if pk in notes], many=True)
+        return self.paginator.get_paginated_response(serializer.data)
     
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        note = serializer.save(user=self.request.user)
+        adjust_public_note_counts(None, (note.lesson_id, note.is_public))
+        invalidate_dashboard(self.request.user.pk)
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        before = (serializer.instance.lesson_id, serializer.instance.is_public)
+        note = serializer.save()
+        adjust_public_note_counts(before, (note.lesson_id, note.is_public))
+        invalidate_dashboard(note.user_id)
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        before = (instance.lesson_id, instance.is_public)
+        instance.delete()
+        adjust_public_note_counts(before, None)
+        invalidate_dashboard(instance.user_id)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def like(self, request, pk=None):
         """点赞笔记"""
         note = self.get_object()
-        UserNote.objects.filter(pk=note.pk).update(like_count=F('like_count') + 1)
-        return Response({'status': 'success', 'like_count': note.like_count + 1})
+        liked = counters.like('note', note.pk, request.user.pk)
+        return Response({
+            'status': 'success' if liked else 'already_liked',
+            'like_count': counters.current_count('note', note, 'like_count')
+        })
 
 
 class AIConfigViewSet(viewsets.ModelViewSet):
@@ -262,154 +489,11 @@ class AIConfigViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response({'detail': '未配置AI服务'}, status=status.HTTP_404_NOT_FOUND)
 
-    @action(detail=False, methods=['get'])
-    def models(self, request):
-        """获取可用模型列表"""
-        provider = request.query_params.get('provider')
-        api_endpoint = request.query_params.get('api_endpoint')
-
-        # 当查询参数缺失时尝试使用当前配置
-        if not provider or not api_endpoint:
-            current_config = AIConfig.objects.filter(user=request.user).first()
-            if current_config:
-                provider = provider or current_config.provider
-                api_endpoint = api_endpoint or current_config.api_endpoint
-
-        if not provider:
-            return Response({'detail': '缺少provider参数'}, status=status.HTTP_400_BAD_REQUEST)
-
-        if provider not in ('ollama_local', 'ollama_remote'):
-            return Response({'detail': '当前仅支持同步Ollama模型'}, status=status.HTTP_400_BAD_REQUEST)
-
-        if not api_endpoint:
-            return Response({'detail': '缺少api_endpoint参数'}, status=status.HTTP_400_BAD_REQUEST)
-
-        endpoint = api_endpoint.rstrip('/')
-
-        try:
-            resp = requests.get(f'{endpoint}/api/tags', timeout=10)
-            resp.raise_for_status()
-        except requests.exceptions.RequestException as exc:
-            logger.warning('无法连接到 Ollama 服务: %s', exc)
-            fallback_models = [
-                {'name': 'qwen3:8b', 'display_name': 'qwen3:8b'},
-                {'name': 'llama3:8b', 'display_name': 'llama3:8b'},
-            ]
-            return Response(
-                {
-                    'models': fallback_models,
-                    'warning': '无法连接到 Ollama 服务，请检查服务是否已启动或更新端点配置。已提供默认模型列表以便继续配置。'
-                }
-            )
-
-        data = resp.json() if resp.content else {}
-        models = data.get('models') or data.get('data') or []
-
-        normalized = []
-        for item in models:
-            if isinstance(item, str):
-                normalized.append({'name': item, 'display_name': item})
-                continue
-
-            name = item.get('name') or item.get('model') or item.get('id')
-            if not name:
-                continue
-
-            normalized.append({
-                'name': name,
-                'display_name': item.get('display_name') or name,
-                'size': item.get('size') or item.get('size_blobs') or item.get('details', {}).get('parameter_size')
-            })
-
-        return Response({'models': normalized})
-    
-    @action(detail=True, methods=['post'])
-    def test(self, request, pk=None):
-        """测试AI配置"""
-        config = self.get_object()
-        
-        try:
-            ai_service = AIServiceFactory.create(config)
-            messages = [{'role': 'user', 'content': 'Hello'}]
-            response = ai_service.chat(messages)
-            return Response({'status': 'success', 'response': response})
-        except Exception as e:
-            return Response(
-                {'status': 'error', 'error': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
 
 class ChatViewSet(viewsets.ViewSet):
     """AI对话视图集"""
     permission_classes = [IsAuthenticated]
     
-    @action(detail=False, methods=['post'])
-    def send(self, request):
-        """发送消息"""
-        serializer = ChatMessageSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        
-        message = serializer.validated_data['message']
-        session_id = serializer.validated_data.get('session_id') or str(uuid.uuid4())
-        extra_context = serializer.validated_data.get('extra_context', {})
-        
-        # 获取用户的AI配置
-        ai_config = AIConfig.objects.filter(user=request.user, is_active=True).first()
-        if not ai_config:
-            return Response(
-                {'error': '请先配置AI服务'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # 保存用户消息
-        ChatHistory.objects.create(
-            user=request.user,
-            session_id=session_id,
-            role='user',
-            content=message,
-            context=extra_context
-        )
-        
-        try:
-            # 获取历史对话
-            history = ChatHistory.objects.filter(
-                user=request.user,
-                session_id=session_id
-            ).order_by('created_at')[:20]  # 最近20条
-            
-            # 构建消息列表
-            messages = []
-            for msg in history:
-                messages.append({
-                    'role': msg.role,
-                    'content': msg.content
-                })
-            
-            # 调用AI服务
-            ai_service = AIServiceFactory.create(ai_config)
-            response_content = ai_service.chat(messages)
-            
-            # 保存AI响应
-            assistant_msg = ChatHistory.objects.create(
-                user=request.user,
-                session_id=session_id,
-                role='assistant',
-                content=response_content
-            )
-            
-            return Response({
-                'session_id': session_id,
-                'message': response_content,
-                'timestamp': assistant_msg.created_at
-            })
-        
-        except Exception as e:
-            return Response(
-                {'error': f'AI服务调用失败: {str(e)}'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-    
     @action(detail=False, methods=['get'])
     def history(self, request):
         """获取聊天历史"""
@@ -455,3 +539,135 @@ class ChatViewSet(viewsets.ViewSet):
         # 按时间倒序
         session_list.sort(key=lambda x: x['updated_at'], reverse=True)
         return Response(session_list)
+
+
+@require_safe
+def course_resource(request, path):
+    """
+    课程资源文件
+    带内容哈希的URL可以永久缓存; 配置了 COURSE_RESOURCES_ACCEL_PREFIX 时
+    只做查找和校验, 文件本身通过 X-Accel-Redirect 交给nginx发送
+    """
+    rel_path, digest = split_hashed_name(path)
+    entry = load_asset_manifest().get(rel_path)
+    # 只提供课程目录 res 文件夹下的文件, 课程根目录下的其他文件(开发环境中是仓库根目录)一律不可访问
+    if not entry and not is_course_resource(rel_path):
+        raise Http404('资源不存在')
+    if digest and (not entry or entry['digest'] != digest):
+        # 文件已经变化(或不在清单中), 旧链接仍然可用但不能长期缓存
+        digest = None
+
+    try:
+        full_path = Path(safe_join(get_course_base_dir(), rel_path))
+    except SuspiciousFileOperation:
+        raise Http404('资源不存在')
+    if not full_path.is_file():
+        raise Http404('资源不存在')
+
+    if entry:
+        etag = f'"{entry["digest"]}"'
+    else:
+        stat = full_path.stat()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content_type = mimetypes.guess_type(full_path.name)[0] or 'application/octet-stream'
+        if settings.COURSE_RESOURCES_ACCEL_PREFIX:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = accel_redirect_path(rel_path)
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    response['ETag'] = etag
+    if digest:
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@require_safe
+def resource_download(request, pk):
+    """
+    下载课时资源
+    下载次数写入计数缓冲; 配置了 MEDIA_ACCEL_PREFIX 时文件由nginx发送
+    """
+    resource = LessonResource.objects.filter(
+        pk=pk, lesson__is_published=True
+    ).only('id', 'title', 'file').first()
+    if resource is None or not resource.file:
+        raise Http404('资源不存在')
+
+    filename = f'{resource.title}{Path(resource.file.name).suffix}'
+    if settings.MEDIA_ACCEL_PREFIX:
+        response = accel_response(resource.file.name, filename)
+    else:
+        try:
+            response = ranged_file_response(request, resource.file.path, filename)
+        except FileNotFoundError:
+            raise Http404('资源不存在')
+
+    if response.status_code in (200, 206) and is_first_request(request):
+        counters.incr('resource', resource.pk, 'download_count')
+    return response
+
+
+@require_safe
+def catalog(request):
+    """
+    课程目录快照(分类 -> 课程 -> 课时摘要)
+    预先序列化和压缩, 内容变化时才重新生成
+    """
+    snapshot = get_snapshot()
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), snapshot)
+    # 强ETag对应具体的字节, 不同压缩格式使用不同的ETag
+    suffix = '' if encoding == 'identity' else f'-{encoding}'
+    etag = f'"{snapshot["digest"]}{suffix}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(snapshot[encoding], content_type='application/json')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search(request):
+    """
+    课时全文搜索
+    参数: q 关键词, course 课程slug(可选), limit 返回条数(默认20, 最多50)
+    """
+    query = request.query_params.get('q', '').strip()
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+    except ValueError:
+        limit = 20
+    start = time.perf_counter()
+    results = search_lessons(query, limit=limit, course=request.query_params.get('course')) if query else []
+    return Response({
+        'query': query,
+        'count': len(results),
+        'results': results,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def suggest(request):
+    """
+    课程/课时/练习题标题自动补全(支持拼音首字母)
+    参数: q 输入前缀, limit 返回条数(默认10, 最多20)
+    """
+    query = request.query_params.get('q', '')
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 20)
+    except ValueError:
+        limit = 10
+    return Response({'query': query, 'results': suggest_titles(query, limit=limit)})
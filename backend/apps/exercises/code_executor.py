@@ -7,6 +7,8 @@ import io
 import signal
 import traceback
 import resource
+import time
+import copy
 from contextlib import contextmanager
 import json
 
@@ -43,6 +45,35 @@ class CodeExecutor:
         except Exception:
             pass  # Windows不支持resource模块
     
+    def restricted_globals(self):
+        """创建受限的全局命名空间"""
+        return {
+            '__builtins__': {
+                'print': print,
+                'range': range,
+                'len': len,
+                'int': int,
+                'float': float,
+                'str': str,
+                'list': list,
+                'dict': dict,
+                'tuple': tuple,
+                'set': set,
+                'abs': abs,
+                'max': max,
+                'min': min,
+                'sum': sum,
+                'sorted': sorted,
+                'enumerate': enumerate,
+                'zip': zip,
+                'map': map,
+                'filter': filter,
+                'True': True,
+                'False': False,
+                'None': None,
+            }
+        }
+    
     def execute(self, code, test_cases=None):
         """
         执行代码
@@ -70,56 +101,33 @@ class CodeExecutor:
             self.set_memory_limit()
             
             # 创建受限的全局命名空间
-            restricted_globals = {
-                '__builtins__': {
-                    'print': print,
-                    'range': range,
-                    'len': len,
-                    'int': int,
-                    'float': float,
-                    'str': str,
-                    'list': list,
-                    'dict': dict,
-                    'tuple': tuple,
-                    'set': set,
-                    'abs': abs,
-                    'max': max,
-                    'min': min,
-                    'sum': sum,
-                    'sorted': sorted,
-                    'enumerate': enumerate,
-                    'zip': zip,
-                    'map': map,
-                    'filter': filter,
-                    'True': True,
-                    'False': False,
-                    'None': None,
-                }
-            }
+            restricted_globals = self.restricted_globals()
             
-            # 执行代码
+            # 执行代码(测试用例也计入时间限制)
+            start = time.perf_counter()
             with self.time_limit(self.timeout):
                 exec(code, restricted_globals)
-            
-            # 获取输出
-            output = sys.stdout.getvalue()
-            error = sys.stderr.getvalue()
-            
-            if error:
-                result['status'] = 'error'
-                result['error_message'] = error
-            else:
-                result['status'] = 'passed'
-                result['output'] = output
-            
-            # 如果有测试用例，运行测试
-            if test_cases:
-                result['test_results'] = self.run_tests(code, test_cases, restricted_globals)
-                # 检查是否所有测试都通过
-                if all(test['passed'] for test in result['test_results']):
-                    result['status'] = 'passed'
+                
+                # 获取输出
+                output = sys.stdout.getvalue()
+                error = sys.stderr.getvalue()
+                
+                if error:
+                    result['status'] = 'error'
+                    result['error_message'] = error
                 else:
-                    result['status'] = 'failed'
+                    result['status'] = 'passed'
+                    result['output'] = output
+                
+                # 如果有测试用例，运行测试
+                if test_cases:
+                    result['test_results'] = self.run_tests(code, test_cases, restricted_globals)
+                    # 检查是否所有测试都通过
+                    if all(test['passed'] for test in result['test_results']):
+                        result['status'] = 'passed'
+                    else:
+                        result['status'] = 'failed'
+            result['execution_time'] = time.perf_counter() - start
         
         except TimeoutError as e:
             result['status'] = 'error'
@@ -180,8 +188,8 @@ class CodeExecutor:
                     
                     test_result['actual_output'] = actual_output
                     
-                    # 比较输出
-                    if actual_output == expected_output:
+                    # 比较输出(期望输出经过JSON存储, 元组等需要按JSON形式比较)
+                    if normalize_output(actual_output) == expected_output:
                         test_result['passed'] = True
                     else:
                         test_result['error'] = f'期望输出: {expected_output}, 实际输出: {actual_output}'
@@ -195,6 +203,71 @@ class CodeExecutor:
         
         return results
     
+    def run_function(self, code, function_name, inputs):
+        """
+        执行代码并用给定参数逐个调用其中的函数(用于根据参考解答生成测试用例)
+        :param code: 参考解答代码
+        :param function_name: 要调用的函数名
+        :param inputs: 参数列表 [[arg1, arg2, ...], ...]
+        :return: {'status', 'error_message', 'results': [{'input', 'output', 'error', 'time'}], 'execution_time'}
+        """
+        result = {
+            'status': 'pending',
+            'error_message': '',
+            'results': [],
+            'execution_time': 0,
+        }
+        
+        old_stdout = sys.stdout
+        old_stderr = sys.stderr
+        sys.stdout = io.StringIO()
+        sys.stderr = io.StringIO()
+        
+        try:
+            self.set_memory_limit()
+            restricted_globals = self.restricted_globals()
+            # 不执行 if __name__ == '__main__' 中的代码
+            restricted_globals['__name__'] = '__solution__'
+            
+            start = time.perf_counter()
+            with self.time_limit(self.timeout):
+                exec(code, restricted_globals)
+                func = restricted_globals.get(function_name)
+                if not callable(func):
+                    raise NameError(f'未找到函数: {function_name}')
+                
+                for args in inputs:
+                    case = {'input': args, 'output': None, 'error': None, 'time': 0}
+                    call_start = time.perf_counter()
+                    try:
+                        # 传入副本, 避免函数修改参数影响记录的输入
+                        case['output'] = func(*copy.deepcopy(args))
+                    except Exception as e:
+                        case['error'] = f"{type(e).__name__}: {str(e)}"
+                    case['time'] = time.perf_counter() - call_start
+                    result['results'].append(case)
+            
+            result['execution_time'] = time.perf_counter() - start
+            result['status'] = 'passed'
+        
+        except TimeoutError as e:
+            result['status'] = 'error'
+            result['error_message'] = str(e)
+        
+        except MemoryError:
+            result['status'] = 'error'
+            result['error_message'] = '内存使用超出限制'
+        
+        except Exception as e:
+            result['status'] = 'error'
+            result['error_message'] = f"{type(e).__name__}: {str(e)}"
+        
+        finally:
+            sys.stdout = old_stdout
+            sys.stderr = old_stderr
+        
+        return result
+    
     def validate_code(self, code):
         """
         验证代码安全性
@@ -215,3 +288,19 @@ class CodeExecutor:
                 return False, f'禁止使用: {keyword}'
         
         return True, ''
+
+
+def normalize_output(value):
+    """把输出转换为JSON存储后的形式(元组变列表等), 无法序列化时原样返回"""
+    try:
+        return json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        return value
+
+
+def run_reference(code, function_name, inputs, timeout=5):
+    """
+    在进程池中运行参考解答(模块级函数, 可以被子进程调用)
+    内存限制只作用于子进程, 不影响调用方
+    """
+    return CodeExecutor(timeout=timeout).run_function(code, function_name, inputs)
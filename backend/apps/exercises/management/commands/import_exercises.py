@@ -2,14 +2,26 @@
 练习题导入脚本
 从课程内容中提取代码示例作为练习题
 """
+import hashlib
 import re
+import time
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import slugify
 from apps.courses.models import Lesson
-from apps.exercises.models import Exercise
+from apps.exercises.models import Exercise, LessonExtraction
+from apps.exercises.test_generation import generate_test_cases
+
+
+# 预编译的提取规则
+EXAMPLE_PATTERN = re.compile(r'####\s*例子\d+[：:](.*?)\n.*?```python\n(.*?)\n```', re.DOTALL)
+DOCSTRING_PATTERN = re.compile(r'"""(.*?)"""', re.DOTALL)
+
+NO_TESTS = {'test_cases': [], 'reference_time': 0, 'time_limit': 5000}
 
 
 class Command(BaseCommand):
-    help = '从课程内容中提取练习题'
+    help = '从课程内容中提取练习题(只处理内容有变化的课时)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -17,45 +29,124 @@ class Command(BaseCommand):
             action='store_true',
             help='清空现有练习题后再导入',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='运行参考解答的进程池大小(默认CPU核数)',
+        )
+        parser.add_argument(
+            '--regenerate-tests',
+            action='store_true',
+            help='同时为已存在的练习题重新生成测试用例',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='忽略内容哈希, 重新提取全部课时',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='每次从数据库读取的课时数',
+        )
 
     def handle(self, *args, **options):
+        start = time.time()
         if options['clear']:
             self.stdout.write(self.style.WARNING('清空现有练习题...'))
             Exercise.objects.all().delete()
+            LessonExtraction.objects.all().delete()
             self.stdout.write(self.style.SUCCESS('数据已清空'))
 
-        total_exercises = 0
+        # 上次提取时的内容哈希, 一次查询取回
+        known_hashes = {} if options['full'] else dict(
+            LessonExtraction.objects.values_list('lesson_id', 'content_hash')
+        )
 
-        # 遍历所有课时
-        lessons = Lesson.objects.all()
-        
-        for lesson in lessons:
-            exercises_created = self._extract_exercises_from_lesson(lesson)
-            total_exercises += exercises_created
-            
-            if exercises_created > 0:
-                self.stdout.write(
-                    f'  课时 "{lesson.title}": 创建 {exercises_created} 个练习'
-                )
+        # 流式遍历课时, 只读取需要的列; 内容未变化的课时直接跳过
+        specs = []
+        extractions = []
+        scanned = 0
+        lessons = Lesson.objects.only('id', 'content', 'day_number').order_by('id')
+        for lesson in lessons.iterator(chunk_size=options['chunk_size']):
+            scanned += 1
+            content_hash = hashlib.md5(lesson.content.encode('utf-8')).hexdigest()
+            if known_hashes.get(lesson.id) == content_hash:
+                continue
+            lesson_specs = self._extract_exercises_from_lesson(lesson)
+            specs.extend(lesson_specs)
+            extractions.append(LessonExtraction(
+                lesson_id=lesson.id, content_hash=content_hash, exercise_count=len(lesson_specs)
+            ))
 
+        if not extractions and not options['regenerate_tests']:
+            self.stdout.write(self.style.SUCCESS(
+                f'扫描 {scanned} 个课时, 内容均未变化, 耗时 {time.time() - start:.2f}秒'
+            ))
+            return
+
+        # 已存在的练习题(按课时+标题判断), 一次查询取回
+        changed_ids = [e.lesson_id for e in extractions]
+        existing = set(Exercise.objects.filter(lesson_id__in=changed_ids).values_list('lesson_id', 'title'))
+        # slug 全表唯一, 新练习题要避开所有已有的 slug
+        used_slugs = set(Exercise.objects.values_list('slug', flat=True))
+
+        # 与 get_or_create 一样, 同一课时内标题重复的例子只创建第一个
+        new_specs = []
+        for spec in specs:
+            key = (spec['lesson_id'], spec['title'])
+            if key not in existing:
+                existing.add(key)
+                new_specs.append(spec)
+        # 重新生成测试用例时处理全部已有练习题(不限于内容有变化的课时), 使用库中保存的参考解答
+        regenerate = list(Exercise.objects.values_list('pk', 'solution')) if options['regenerate_tests'] else []
+
+        # 在沙箱进程池中运行参考解答, 生成真实的测试用例
+        solutions = [spec['defaults']['solution'] for spec in new_specs] + [solution for _, solution in regenerate]
+        self.stdout.write(
+            f'扫描 {scanned} 个课时, {len(extractions)} 个有变化, 运行 {len(solutions)} 个参考解答...'
+        )
+        generated = generate_test_cases(dict(enumerate(solutions)), workers=options['workers'])
+
+        new_exercises = []
+        for idx, spec in enumerate(new_specs):
+            defaults = dict(spec['defaults'], **generated.get(idx, NO_TESTS))
+            # 同一课时内容变化后序号可能重复, slug 需要避开已有的
+            slug = base_slug = defaults.pop('slug')
+            suffix = 2
+            while slug in used_slugs:
+                slug = f'{base_slug}-{suffix}'
+                suffix += 1
+            used_slugs.add(slug)
+            new_exercises.append(Exercise(lesson_id=spec['lesson_id'], title=spec['title'], slug=slug, **defaults))
+
+        updated_exercises = []
+        for idx, (pk, _) in enumerate(regenerate, start=len(new_specs)):
+            updated_exercises.append(Exercise(pk=pk, **generated.get(idx, NO_TESTS)))
+
+        with transaction.atomic():
+            Exercise.objects.bulk_create(new_exercises)
+            if updated_exercises:
+                Exercise.objects.bulk_update(updated_exercises, ['test_cases', 'reference_time', 'time_limit'])
+            LessonExtraction.objects.filter(lesson_id__in=changed_ids).delete()
+            LessonExtraction.objects.bulk_create(extractions)
+
+        judgeable = sum(1 for exercise in new_exercises if exercise.test_cases)
         self.stdout.write(self.style.SUCCESS(
-            f'\n导入完成! 共创建 {total_exercises} 个练习题'
+            f'\n导入完成! 共创建 {len(new_exercises)} 个练习题, 可自动评测 {judgeable} 个, '
+            f'耗时 {time.time() - start:.2f}秒'
         ))
+        if updated_exercises:
+            self.stdout.write(self.style.SUCCESS(f'重新生成 {len(updated_exercises)} 个已有练习题的测试用例'))
 
     def _extract_exercises_from_lesson(self, lesson):
         """从课时内容中提取练习题"""
-        content = lesson.content
-        exercises_created = 0
+        specs = []
 
-        # 提取代码块
-        code_blocks = re.findall(r'```python\n(.*?)\n```', content, re.DOTALL)
-        
         # 提取例子标题和代码
-        examples = re.findall(
-            r'####\s*例子\d+[：:](.*?)\n.*?```python\n(.*?)\n```',
-            content,
-            re.DOTALL
-        )
+        examples = EXAMPLE_PATTERN.findall(lesson.content)
 
         for idx, (title, code) in enumerate(examples, start=1):
             title = title.strip()
@@ -66,7 +157,7 @@ class Command(BaseCommand):
                 continue
             
             # 从代码注释中提取描述
-            description_match = re.search(r'"""(.*?)"""', code, re.DOTALL)
+            description_match = DOCSTRING_PATTERN.search(code)
             if description_match:
                 description = description_match.group(1).strip()
             else:
@@ -75,26 +166,21 @@ class Command(BaseCommand):
             # 提取初始代码(去掉注释后的代码,作为模板)
             initial_code = self._generate_initial_code(code)
             
-            # 创建练习题
-            from django.utils.text import slugify
-            exercise, created = Exercise.objects.get_or_create(
-                lesson=lesson,
-                title=title,
-                defaults={
+            # 测试用例在所有课时收集完后统一生成
+            specs.append({
+                'lesson_id': lesson.id,
+                'title': title,
+                'defaults': {
                     'slug': slugify(f"{lesson.id}-{title}-{idx}"),
                     'problem_description': description,
                     'difficulty': self._determine_difficulty(lesson.day_number),
                     'template_code': initial_code,
                     'solution': code,
-                    'test_cases': self._generate_test_cases_json(title),
                     'examples': self._generate_examples_json(title),
                 }
-            )
-            
-            if created:
-                exercises_created += 1
+            })
 
-        return exercises_created
+        return specs
 
     def _generate_initial_code(self, solution_code):
         """生成初始代码模板"""
@@ -130,15 +216,6 @@ class Command(BaseCommand):
         else:
             return 'hard'
 
-    def _generate_test_cases_json(self, title):
-        """生成测试用例(JSON格式)"""
-        return [
-            {
-                "input": "请根据题目要求输入",
-                "output": "期望输出"
-            }
-        ]
-    
     def _generate_examples_json(self, title):
         """生成示例(JSON格式)"""
         return [
@@ -148,15 +225,3 @@ class Command(BaseCommand):
                 "explanation": "这是一个示例"
             }
         ]
-
-    def _generate_test_cases(self, title):
-        """生成测试用例(示例) - 已弃用"""
-        # 这里返回一个简单的JSON字符串示例
-        # 实际项目中应该根据题目类型生成真实的测试用例
-        return '''[
-    {
-        "input": "请根据题目要求输入",
-        "expected_output": "期望输出",
-        "description": "测试用例1"
-    }
-]'''
@@ -30,7 +30,13 @@ class Exercise(models.Model):
     output_format = models.TextField('输出格式说明', blank=True)
     constraints = models.TextField('约束条件', blank=True)
     examples = models.JSONField('示例', default=list, help_text='[{"input": "...", "output": "...", "explanation": "..."}]')
-    test_cases = models.JSONField('测试用例', default=list, help_text='[{"input": "...", "output": "..."}]')
+    test_cases = models.JSONField(
+        '测试用例',
+        default=list,
+        help_text='[{"function_name": "...", "input": [...], "expected_output": ...}]'
+    )
+    reference_time = models.FloatField('参考解答运行时间(ms)', default=0)
+    time_limit = models.IntegerField('时间限制(ms)', default=5000)
     template_code = models.TextField('代码模板', blank=True)
     solution = models.TextField('参考解答', blank=True)
     tags = models.CharField('标签', max_length=200, blank=True, help_text='用逗号分隔')
@@ -47,6 +53,11 @@ class Exercise(models.Model):
     
     def __str__(self):
         return self.title
+    
+    @property
+    def time_limit_seconds(self):
+        """沙箱使用整数秒的时间限制"""
+        return max(1, -(-self.time_limit // 1000))
 
 
 class Submission(models.Model):
@@ -100,3 +111,24 @@ class Submission(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.exercise.title} - {self.status}"
+
+
+class LessonExtraction(models.Model):
+    """课时练习题提取记录(内容哈希未变化的课时不再重复提取)"""
+    lesson = models.OneToOneField(
+        Lesson,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='exercise_extraction',
+        verbose_name='课时'
+    )
+    content_hash = models.CharField('内容哈希', max_length=32)
+    exercise_count = models.IntegerField('提取练习数', default=0)
+    extracted_at = models.DateTimeField('提取时间', auto_now=True)
+    
+    class Meta:
+        verbose_name = '练习题提取记录'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.lesson_id} - {self.content_hash}"
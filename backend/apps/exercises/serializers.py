@@ -12,6 +12,7 @@ class ExerciseListSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'difficulty', 'tags_list',
             'acceptance_rate', 'submit_count', 'accepted_count'
         ]
+        projection_fields = ['tags']
     
     def get_tags_list(self, obj):
         return obj.tags.split(',') if obj.tags else []
@@ -30,6 +31,7 @@ class ExerciseDetailSerializer(serializers.ModelSerializer):
             'template_code', 'tags_list', 'lesson_title',
             'acceptance_rate', 'submit_count', 'accepted_count', 'created_at'
         ]
+        projection_fields = ['tags']
     
     def get_tags_list(self, obj):
         return obj.tags.split(',') if obj.tags else []
@@ -0,0 +1,228 @@
+"""
+测试用例生成
+通过 AST 分析参考解答中的函数签名, 按文档中的示例(>>> 调用)或根据参数
+注解/默认值/参数名推断的生成器构造输入, 在沙箱进程池中运行参考解答得到期望输出
+"""
+import ast
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .code_executor import normalize_output, run_reference
+
+
+# 参数名 -> 生成器类型
+NAME_HINTS = {
+    'int': {
+        'n', 'm', 'k', 'x', 'y', 'a', 'b', 'c', 'i', 'j', 'num', 'number', 'count',
+        'year', 'month', 'day', 'size', 'length', 'start', 'end', 'stop', 'step',
+        'base', 'row', 'rows', 'col', 'cols', 'height', 'width', 'limit', 'times',
+        'index', 'num1', 'num2', 'low', 'high', 'total', 'age', 'level',
+    },
+    'float': {'f', 'ratio', 'rate', 'price', 'score', 'weight', 'radius', 'temperature'},
+    'str': {
+        's', 'string', 'text', 'word', 'name', 'content', 'line', 'sentence', 'chars',
+        'str1', 'str2', 's1', 's2', 'password', 'prefix', 'suffix', 'sep', 'message', 'msg',
+    },
+    'list_int': {
+        'nums', 'numbers', 'items', 'lst', 'alist', 'arr', 'array', 'values', 'data',
+        'elements', 'seq', 'scores', 'li', 'items1', 'items2', 'list1', 'list2',
+    },
+    'list_str': {'words', 'names', 'strings', 'lines'},
+    'bool': {'flag', 'reverse', 'ascending', 'descending'},
+}
+
+ANNOTATION_KINDS = {
+    'int': 'int', 'float': 'float', 'str': 'str', 'bool': 'bool',
+    'list': 'list_int', 'List': 'list_int', 'list[int]': 'list_int', 'List[int]': 'list_int',
+    'list[str]': 'list_str', 'List[str]': 'list_str',
+}
+
+WORDS = ['hello', 'Python', 'level', 'abcba', 'hello world', 'OpenAI', 'a', '12321', 'Madam']
+
+
+def _gen_int(rng, index):
+    # 前几个用例覆盖边界值, 其余随机(取值较小, 避免递归类解答超时)
+    edges = [0, 1, 2, 5, 10]
+    return edges[index] if index < len(edges) else rng.randint(3, 20)
+
+
+GENERATORS = {
+    'int': _gen_int,
+    'float': lambda rng, index: round(rng.uniform(0, 100), 2),
+    'str': lambda rng, index: WORDS[index % len(WORDS)] if index < len(WORDS) else rng.choice(WORDS),
+    'bool': lambda rng, index: index % 2 == 0,
+    'list_int': lambda rng, index: [rng.randint(-10, 50) for _ in range(index if index < 3 else rng.randint(3, 8))],
+    'list_str': lambda rng, index: rng.sample(WORDS, min(len(WORDS), index + 1)),
+}
+
+
+def _infer_kind(arg, default):
+    """根据注解、默认值和参数名推断生成器类型"""
+    if arg.annotation is not None:
+        kind = ANNOTATION_KINDS.get(ast.unparse(arg.annotation).replace(' ', ''))
+        if kind:
+            return kind
+    if default is not None:
+        try:
+            value = ast.literal_eval(default)
+        except ValueError:
+            value = None
+        for kind, type_ in (('bool', bool), ('int', int), ('float', float), ('str', str)):
+            if isinstance(value, type_):
+                return kind
+    name = arg.arg.lower()
+    for kind, names in NAME_HINTS.items():
+        if name in names:
+            return kind
+    if name.startswith('is_') or name.startswith('has_'):
+        return 'bool'
+    return None
+
+
+def _declared_calls(func_node):
+    """文档中 >>> func(...) 形式的示例调用"""
+    docstring = ast.get_docstring(func_node) or ''
+    calls = []
+    for line in docstring.splitlines():
+        line = line.strip()
+        if not line.startswith('>>>'):
+            continue
+        try:
+            expr = ast.parse(line[3:].strip(), mode='eval').body
+            if (isinstance(expr, ast.Call) and isinstance(expr.func, ast.Name)
+                    and expr.func.id == func_node.name and not expr.keywords):
+                args = [ast.literal_eval(a) for a in expr.args]
+                json.dumps(args)
+                calls.append(args)
+        except (SyntaxError, ValueError, TypeError):
+            continue
+    return calls
+
+
+def extract_signatures(solution):
+    """
+    提取参考解答中可测试的顶层函数
+    :return: [{'name', 'kinds': [生成器类型, ...], 'declared': [[参数...], ...]}, ...]
+    """
+    try:
+        tree = ast.parse(solution)
+    except SyntaxError:
+        return []
+
+    signatures = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef) or node.name.startswith('_') or node.name == 'main':
+            continue
+        args = node.args
+        if args.vararg or args.kwarg or args.kwonlyargs or args.posonlyargs:
+            continue
+        positional = args.args
+        if not positional:
+            continue
+
+        # 只为没有默认值的参数生成输入, 有默认值的使用默认值
+        defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+        required = [(arg, default) for arg, default in zip(positional, defaults) if default is None]
+        kinds = [_infer_kind(arg, default) for arg, default in required]
+        declared = _declared_calls(node)
+        if None in kinds and not declared:
+            continue
+
+        signatures.append({
+            'name': node.name,
+            'kinds': kinds if None not in kinds else None,
+            'declared': declared,
+        })
+    return signatures
+
+
+def build_inputs(signature, count=5, seed=0):
+    """生成输入参数列表: 先用文档示例, 再用推断出的生成器补足"""
+    inputs = [list(args) for args in signature['declared']]
+    kinds = signature['kinds']
+    if kinds is None:
+        return inputs[:count]
+
+    rng = random.Random(f"{seed}:{signature['name']}")
+    seen = {json.dumps(args, sort_keys=True) for args in inputs}
+    index = 0
+    while len(inputs) < count and index < count * 4:
+        args = [GENERATORS[kind](rng, index) for kind in kinds]
+        index += 1
+        key = json.dumps(args, sort_keys=True)
+        if key in seen:
+            continue
+        seen.add(key)
+        inputs.append(args)
+    return inputs
+
+
+def _to_test_cases(function_name, run_result):
+    """把参考解答的运行结果转换为 CodeExecutor.run_tests 使用的测试用例"""
+    cases = []
+    for case in run_result['results']:
+        if case['error'] is not None:
+            continue
+        output = normalize_output(case['output'])
+        # 无法用JSON表示的输出(集合、对象等)无法存储比较, 跳过
+        if output is case['output'] and not isinstance(output, (int, float, str, bool, type(None))):
+            continue
+        cases.append({
+            'name': f'测试用例 {len(cases) + 1}',
+            'function_name': function_name,
+            'input': case['input'],
+            'expected_output': output,
+        })
+    return cases
+
+
+def time_limit_for(reference_ms, factor=10, minimum_ms=1000):
+    """根据参考解答运行时间确定时间限制(毫秒, 向上取整到秒)"""
+    return max(minimum_ms, int(math.ceil(reference_ms * factor / 1000.0)) * 1000)
+
+
+def generate_test_cases(solutions, count=5, workers=None, timeout=5):
+    """
+    在沙箱进程池中并行运行参考解答, 生成测试用例
+    :param solutions: {key: 参考解答代码}
+    :return: {key: {'test_cases': [...], 'reference_time': 毫秒, 'time_limit': 毫秒}}
+    """
+    jobs = {}
+    for key, solution in solutions.items():
+        for signature in extract_signatures(solution):
+            inputs = build_inputs(signature, count=count)
+            if inputs:
+                jobs[(key, signature['name'])] = (solution, inputs)
+
+    generated = {}
+    if not jobs:
+        return generated
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_reference, solution, name, inputs, timeout): (key, name)
+            for (key, name), (solution, inputs) in jobs.items()
+        }
+        for future in as_completed(futures):
+            key, name = futures[future]
+            try:
+                run_result = future.result()
+            except Exception:
+                continue
+            if run_result['status'] != 'passed':
+                continue
+            cases = _to_test_cases(name, run_result)
+            if not cases:
+                continue
+            entry = generated.setdefault(key, {'test_cases': [], 'reference_time': 0.0})
+            entry['test_cases'].extend(cases)
+            entry['reference_time'] += run_result['execution_time'] * 1000
+
+    for entry in generated.values():
+        entry['test_cases'].sort(key=lambda c: c['function_name'])
+        for index, case in enumerate(entry['test_cases'], start=1):
+            case['name'] = f'测试用例 {index}'
+        entry['reference_time'] = round(entry['reference_time'], 3)
+        entry['time_limit'] = time_limit_for(entry['reference_time'])
+    return generated
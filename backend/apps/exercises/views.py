@@ -3,14 +3,16 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import F
+from django.db.models import F, Sum
 
+from apps.courses.conditional import ConditionalGetMixin
+from apps.courses.projection import FieldProjectionMixin
 from .models import Exercise, Submission
 from .serializers import ExerciseListSerializer, ExerciseDetailSerializer, SubmissionSerializer
 from .code_executor import CodeExecutor
 
 
-class ExerciseViewSet(viewsets.ReadOnlyModelViewSet):
+class ExerciseViewSet(ConditionalGetMixin, FieldProjectionMixin, viewsets.ReadOnlyModelViewSet):
     """练习视图集"""
     queryset = Exercise.objects.all()
     lookup_field = 'slug'
@@ -26,6 +28,13 @@ class ExerciseViewSet(viewsets.ReadOnlyModelViewSet):
             return ExerciseDetailSerializer
         return ExerciseListSerializer
     
+    # 提交/通过次数用 F() 更新, 不改变 updated_at, 需要单独加入 ETag
+    def etag_annotations(self):
+        return {'submits': F('submit_count'), 'accepted': F('accepted_count')}
+    
+    def etag_aggregates(self):
+        return {'submits': Sum('submit_count'), 'accepted': Sum('accepted_count')}
+    
     @action(detail=False, methods=['post'], permission_classes=[])
     def run_code(self, request):
         """运行Python代码（允许匿名访问）"""
@@ -75,8 +84,8 @@ class ExerciseViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # 验证代码安全性
-        executor = CodeExecutor()
+        # 验证代码安全性(时间限制根据参考解答的运行时间确定)
+        executor = CodeExecutor(timeout=exercise.time_limit_seconds)
         is_valid, error_msg = executor.validate_code(code)
         if not is_valid:
             return Response(
@@ -0,0 +1,69 @@
+"""
+用户学习概览
+所有计数用一次条件聚合查询得到, 最近学习的课时再用一次查询; 结果按用户缓存,
+学习进度和笔记的写入接口调用 invalidate_dashboard 使缓存失效
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from apps.courses.models import UserNote, UserProgress
+
+
+DASHBOARD_TIMEOUT = 600
+RECENT_LESSONS = 5
+
+
+def dashboard_key(user_id):
+    return f'dashboard:{user_id}'
+
+
+def _notes_count(**filters):
+    notes = UserNote.objects.filter(user=OuterRef('pk'), **filters).order_by().values('user')
+    return Coalesce(Subquery(notes.annotate(total=Count('pk')).values('total')), 0, output_field=IntegerField())
+
+
+def build_dashboard(user):
+    counts = User.objects.filter(pk=user.pk).annotate(
+        started_lessons=Count('learning_progress'),
+        completed_lessons=Count('learning_progress', filter=Q(learning_progress__status='completed')),
+        in_progress_lessons=Count('learning_progress', filter=Q(learning_progress__status='in_progress')),
+        total_study_time=Coalesce(Sum('learning_progress__study_time'), 0),
+        total_notes=_notes_count(),
+        public_notes=_notes_count(is_public=True),
+    ).values(
+        'started_lessons', 'completed_lessons', 'in_progress_lessons',
+        'total_study_time', 'total_notes', 'public_notes',
+    ).first() or {}
+
+    recent = UserProgress.objects.filter(user=user).select_related('lesson__course').only(
+        'progress_percentage', 'status', 'last_accessed',
+        'lesson__id', 'lesson__slug', 'lesson__title', 'lesson__course__title',
+    ).order_by('-last_accessed')[:RECENT_LESSONS]
+
+    counts['recent_lessons'] = [{
+        'lesson_id': up.lesson.id,
+        'lesson_slug': up.lesson.slug,
+        'lesson_title': up.lesson.title,
+        'course_title': up.lesson.course.title,
+        'status': up.status,
+        'progress': up.progress_percentage,
+        'last_studied': up.last_accessed,
+    } for up in recent]
+    return counts
+
+
+def get_dashboard(user):
+    key = dashboard_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(user)
+        cache.set(key, data, DASHBOARD_TIMEOUT)
+    return data
+
+
+def invalidate_dashboard(user_id):
+    """在当前事务提交后删除缓存(没有事务时立即删除)"""
+    transaction.on_commit(lambda: cache.delete(dashboard_key(user_id)))
@@ -74,21 +74,13 @@ class UserProfileSerializer(serializers.ModelSerializer):
     
     def get_completed_lessons(self, obj):
         """获取已完成的课时数"""
-        from apps.courses.models import UserProgress
-        return UserProgress.objects.filter(
-            user=obj,
-            status='completed'
-        ).count()
+        from .dashboard import get_dashboard
+        return get_dashboard(obj)['completed_lessons']
     
     def get_total_study_time(self, obj):
         """获取总学习时长(分钟)"""
-        from apps.courses.models import UserProgress
-        from django.db.models import Sum
-        
-        result = UserProgress.objects.filter(user=obj).aggregate(
-            total=Sum('study_time')
-        )
-        return result['total'] or 0
+        from .dashboard import get_dashboard
+        return get_dashboard(obj)['total_study_time']
 
 
 class UserAdminSerializer(serializers.ModelSerializer):
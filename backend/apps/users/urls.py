@@ -4,7 +4,7 @@ from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
     UserViewSet, UserRegisterView,
-    CustomTokenObtainPairView, user_stats,
+    CustomTokenObtainPairView, user_stats, user_dashboard,
     UserAdminViewSet
 )
 
@@ -20,6 +20,7 @@ urlpatterns = [
     
     # 用户统计
     path('users/stats/', user_stats, name='user_stats'),
+    path('users/dashboard/', user_dashboard, name='user_dashboard'),
     
     # 其他用户接口
     path('', include(router.urls)),
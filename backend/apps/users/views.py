@@ -11,6 +11,7 @@ from .serializers import (
     CustomTokenObtainPairSerializer, UserProfileSerializer,
     UserAdminSerializer
 )
+from .dashboard import get_dashboard
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -147,41 +148,17 @@ class UserAdminViewSet(viewsets.ModelViewSet):
 @permission_classes([IsAuthenticated])
 def user_stats(request):
     """获取用户学习统计"""
-    from apps.courses.models import UserProgress, UserNote
-    
-    user = request.user
-    
-    # 已完成课时数
-    completed_count = UserProgress.objects.filter(
-        user=user,
-        status='completed'
-    ).count()
-    
-    # 学习中的课时数
-    in_progress_count = UserProgress.objects.filter(
-        user=user,
-        status='in_progress'
-    ).count()
-    
-    # 笔记数
-    notes_count = UserNote.objects.filter(user=user).count()
-    
-    # 最近学习的课程
-    recent_lessons = UserProgress.objects.filter(
-        user=user
-    ).select_related('lesson', 'lesson__course').order_by('-updated_at')[:5]
-    
-    recent_lessons_data = [{
-        'lesson_id': up.lesson.id,
-        'lesson_title': up.lesson.title,
-        'course_title': up.lesson.course.title,
-        'progress': up.progress_percentage,
-        'last_studied': up.last_accessed,
-    } for up in recent_lessons]
-    
+    dashboard = get_dashboard(request.user)
     return Response({
-        'completed_lessons': completed_count,
-        'in_progress_lessons': in_progress_count,
-        'total_notes': notes_count,
-        'recent_lessons': recent_lessons_data,
+        'completed_lessons': dashboard['completed_lessons'],
+        'in_progress_lessons': dashboard['in_progress_lessons'],
+        'total_notes': dashboard['total_notes'],
+        'recent_lessons': dashboard['recent_lessons'],
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_dashboard(request):
+    """用户学习概览(计数和最近学习的课时, 按用户缓存)"""
+    return Response(get_dashboard(request.user))
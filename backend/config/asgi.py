@@ -1,9 +1,36 @@
 """
 ASGI config for Python-100-Days project.
+只用于承载调用AI服务的异步接口的 ASGI 进程, 默认使用 config.settings_asgi
 """
 import os
-from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import django
+from asgiref.sync import SyncToAsync, ThreadSensitiveContext
+from django.core.handlers.asgi import ASGIHandler
 
-application = get_asgi_application()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings_asgi')
+
+
+# 所有请求共用的同步调用上下文
+shared_context = ThreadSensitiveContext()
+
+
+class SharedThreadASGIHandler(ASGIHandler):
+    """
+    Django 默认为每个请求建立一个 ThreadSensitiveContext, 请求中第一次同步调用(request_started 信号、ORM)
+    会为它创建一个专属线程, 直到响应结束才释放, 每个进行中的流式对话都占着一个线程;
+    这里让所有请求共用一个上下文, 同步调用在同一个线程中依次执行, 进行中的请求只占用协程
+    (这个进程只处理调用AI服务的接口, 同步部分只是几次很短的数据库查询)
+    """
+
+    async def __call__(self, scope, receive, send):
+        # ThreadSensitiveContext 可重入, 外层已设置时 Django 不再为请求新建上下文
+        token = SyncToAsync.thread_sensitive_context.set(shared_context)
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            SyncToAsync.thread_sensitive_context.reset(token)
+
+
+django.setup(set_prefix=False)
+application = SharedThreadASGIHandler()
@@ -0,0 +1,345 @@
+"""
+两级缓存后端
+L1 为进程内的 LRU 缓存(条目数有上限, 带过期时间), L2 为 Redis(django_redis)
+写入/删除时通过 Redis pub/sub 通知其他进程淘汰各自的 L1 条目
+Redis 不可用时退化为只使用 L1, 并在一段时间后重试连接
+
+配置示例:
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'config.cache.TwoTierCache',
+            'LOCATION': 'redis://localhost:6379/1',
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'L1_MAX_ENTRIES': 2000,   # L1 最多条目数
+                'L1_TIMEOUT': 60,         # L1 条目最长存活时间(秒)
+                'L2_RETRY_INTERVAL': 5,   # Redis 不可用后多久重试(秒)
+                'L1_SUBSCRIBE_POLL': 30,  # 失效订阅每次等待消息的最长时间(秒)
+            },
+        }
+    }
+"""
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django_redis.cache import RedisCache
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalCache:
+    """进程内 LRU 缓存, 值以 pickle 形式保存, 读取方修改返回值不影响缓存"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires, payload = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, key, value, ttl):
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+            return
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires, payload)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class _ProcessState:
+    """
+    同一进程内共享的 L1 与订阅线程
+    Django 为每个线程创建独立的缓存后端实例, L1 必须按进程共享
+    """
+
+    def __init__(self, max_entries):
+        self.local = LocalCache(max_entries)
+        self.sender = uuid.uuid4().hex
+        self.subscriber = None
+        self.lock = threading.Lock()
+        # Redis 不可用时, 在此时间之前不再访问 Redis
+        self.l2_down_until = 0.0
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+class TwoTierCache(RedisCache):
+    """L1 进程内缓存 + L2 Redis 缓存"""
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        options = params.get('OPTIONS', {})
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 60))
+        self._l2_retry_interval = float(options.get('L2_RETRY_INTERVAL', 5))
+        self._channel = options.get('L1_CHANNEL', 'cache:l1-evict')
+        self._subscribe_poll = float(options.get('L1_SUBSCRIBE_POLL', 30))
+
+    # ---- 进程共享状态与失效订阅 ----
+
+    @property
+    def _state(self):
+        # 按进程区分: gunicorn fork 出的子进程不继承父进程的 L1 和订阅线程
+        state_key = (os.getpid(), str(self._server), self._channel)
+        state = _states.get(state_key)
+        if state is None:
+            with _states_lock:
+                state = _states.get(state_key)
+                if state is None:
+                    state = _states[state_key] = _ProcessState(self._l1_max_entries)
+        return state
+
+    def _ensure_subscriber(self, state):
+        if state.subscriber is not None and state.subscriber.is_alive():
+            return
+        with state.lock:
+            if state.subscriber is not None and state.subscriber.is_alive():
+                return
+            state.subscriber = threading.Thread(
+                target=self._subscribe_loop, args=(state,), name='cache-l1-evict', daemon=True
+            )
+            state.subscriber.start()
+
+    def _subscribe_loop(self, state):
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.client.get_client(write=True).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                # 订阅中断期间可能漏掉失效消息, 重新订阅后清空 L1
+                state.local.clear()
+                while True:
+                    # 连接配置了 SOCKET_TIMEOUT, listen() 空闲超时会抛出 TimeoutError;
+                    # get_message 按自己的 timeout 等待, 没有消息时返回 None, 不算连接中断
+                    message = pubsub.get_message(timeout=self._subscribe_poll)
+                    if message is not None:
+                        self._handle_message(state, message)
+            except (RedisError, ConnectionInterrupted, OSError):
+                time.sleep(self._l2_retry_interval)
+            except Exception:
+                logger.exception('L1 缓存失效订阅异常')
+                time.sleep(self._l2_retry_interval)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def _handle_message(self, state, message):
+        try:
+            payload = json.loads(message['data'])
+        except (TypeError, ValueError):
+            return
+        if payload.get('sender') == state.sender:
+            return
+        if payload.get('clear'):
+            state.local.clear()
+        for key in payload.get('keys', ()):
+            state.local.delete(key)
+
+    def _publish(self, state, keys=(), clear=False):
+        """通知其他进程淘汰 L1 条目"""
+        message = json.dumps({'sender': state.sender, 'keys': [str(k) for k in keys], 'clear': clear})
+        self._l2_call(state, lambda: self.client.get_client(write=True).publish(self._channel, message))
+
+    # ---- L2 访问与降级 ----
+
+    def _l2_call(self, state, func, fallback=None):
+        """访问 Redis; 不可用时记录并在重试间隔内直接返回 fallback"""
+        if state.l2_down_until > time.monotonic():
+            return fallback
+        try:
+            result = func()
+        except (ConnectionInterrupted, RedisError, OSError) as e:
+            if state.l2_down_until == 0.0 or state.l2_down_until <= time.monotonic():
+                logger.warning('Redis 缓存不可用, 暂时只使用进程内缓存: %s', e)
+            state.l2_down_until = time.monotonic() + self._l2_retry_interval
+            return fallback
+        if state.l2_down_until:
+            state.l2_down_until = 0.0
+            # 恢复后其他进程的写入可能未通知到本进程
+            state.local.clear()
+        self._ensure_subscriber(state)
+        return result
+
+    def _l1_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self._l1_timeout
+        return min(timeout - time.time(), self._l1_timeout)
+
+    def _key(self, key, version=None):
+        return str(self.client.make_key(key, version=version))
+
+    # ---- 缓存接口 ----
+
+    def get(self, key, default=None, version=None, client=None):
+        state = self._state
+        full_key = self._key(key, version)
+        value = state.local.get(full_key)
+        if value is not _MISSING:
+            return value
+        value = self._l2_call(
+            state, lambda: self.client.get(key, default=_MISSING, version=version, client=client), _MISSING
+        )
+        if value is _MISSING:
+            return default
+        state.local.set(full_key, value, self._l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None, nx=False, xx=False):
+        state = self._state
+        full_key = self._key(key, version)
+        result = self._l2_call(
+            state,
+            lambda: self.client.set(key, value, timeout=timeout, version=version, client=client, nx=nx, xx=xx),
+            _MISSING,
+        )
+        if result is _MISSING:
+            # 只使用 L1
+            state.local.set(full_key, value, self._l1_ttl(timeout))
+            return True
+        if result:
+            state.local.set(full_key, value, self._l1_ttl(timeout))
+            self._publish(state, [full_key])
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        # add 常用于加锁, 以 Redis 为准, 不写入 L1
+        state = self._state
+        full_key = self._key(key, version)
+        result = self._l2_call(
+            state, lambda: self.client.add(key, value, timeout=timeout, version=version, client=client), _MISSING
+        )
+        if result is _MISSING:
+            if state.local.get(full_key) is not _MISSING:
+                return False
+            state.local.set(full_key, value, self._l1_ttl(timeout))
+            return True
+        state.local.delete(full_key)
+        return result
+
+    def delete(self, key, version=None, prefix=None, client=None):
+        state = self._state
+        full_key = self._key(key, version)
+        deleted = state.local.delete(full_key)
+        result = self._l2_call(
+            state, lambda: self.client.delete(key, version=version, prefix=prefix, client=client), None
+        )
+        self._publish(state, [full_key])
+        return bool(result) or deleted
+
+    def get_many(self, keys, version=None, client=None):
+        state = self._state
+        found = {}
+        missing = []
+        for key in keys:
+            value = state.local.get(self._key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            fetched = self._l2_call(
+                state, lambda: self.client.get_many(missing, version=version, client=client), {}
+            )
+            for key, value in fetched.items():
+                state.local.set(self._key(key, version), value, self._l1_timeout)
+                found[key] = value
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        for key, value in data.items():
+            self.set(key, value, timeout=timeout, version=version, client=client)
+        return []
+
+    def delete_many(self, keys, version=None, client=None):
+        state = self._state
+        full_keys = [self._key(key, version) for key in keys]
+        for full_key in full_keys:
+            state.local.delete(full_key)
+        result = self._l2_call(state, lambda: self.client.delete_many(keys, version=version, client=client), None)
+        self._publish(state, full_keys)
+        return result
+
+    def delete_pattern(self, *args, **kwargs):
+        state = self._state
+        state.local.clear()
+        kwargs.setdefault('itersize', self._default_scan_itersize)
+        result = self._l2_call(state, lambda: self.client.delete_pattern(*args, **kwargs), 0)
+        self._publish(state, clear=True)
+        return result
+
+    def clear(self):
+        state = self._state
+        state.local.clear()
+        result = self._l2_call(state, lambda: self.client.clear(), None)
+        self._publish(state, clear=True)
+        return result
+
+    def has_key(self, key, version=None, client=None):
+        # 以 Redis 为准(锁等短期键), Redis 不可用时查 L1
+        state = self._state
+        result = self._l2_call(state, lambda: self.client.has_key(key, version=version, client=client), _MISSING)
+        if result is _MISSING:
+            return state.local.get(self._key(key, version)) is not _MISSING
+        return result
+
+    def incr(self, key, delta=1, version=None, client=None):
+        # 计数以 Redis 为准, 不写入 L1, 同时淘汰各进程中的旧值
+        state = self._state
+        full_key = self._key(key, version)
+        result = self._l2_call(
+            state, lambda: self.client.incr(key, delta=delta, version=version, client=client), _MISSING
+        )
+        if result is _MISSING:
+            value = state.local.get(full_key)
+            if value is _MISSING:
+                raise ValueError(f"Key '{key}' not found")
+            result = value + delta
+            state.local.set(full_key, result, self._l1_timeout)
+            return result
+        state.local.delete(full_key)
+        self._publish(state, [full_key])
+        return result
+
+    def decr(self, key, delta=1, version=None, client=None):
+        return self.incr(key, -delta, version=version, client=client)
@@ -122,10 +122,22 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# nginx内部location前缀, 设置后资源下载通过 X-Accel-Redirect 由nginx发送
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '')
 
 # 课程资源文件
 COURSE_RESOURCES_ROOT = BASE_DIR / 'course_resources'
 COURSE_RESOURCES_URL = '/course-res/'
+# nginx内部location前缀, 设置后课程资源通过 X-Accel-Redirect 由nginx发送
+COURSE_RESOURCES_ACCEL_PREFIX = os.getenv('COURSE_RESOURCES_ACCEL_PREFIX', '')
+
+# 课程图片衍生文件(缩略图/WebP), 文件名带内容哈希, 可长期缓存
+COURSE_DERIVATIVES_ROOT = BASE_DIR / 'course_derivatives'
+COURSE_DERIVATIVES_URL = '/course-derived/'
+COURSE_IMAGE_WIDTHS = [320, 640, 1280]
+
+# 课时全文搜索索引(由 build_search_index 生成)
+SEARCH_INDEX_PATH = COURSE_DERIVATIVES_ROOT / 'search_index.json.gz'
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -166,18 +178,37 @@ CORS_ALLOWED_ORIGINS = os.getenv(
 ).split(',')
 CORS_ALLOW_CREDENTIALS = True
 
-# Redis缓存配置
+# 缓存配置: 进程内L1缓存 + Redis L2缓存, 写入时通过Redis pub/sub通知各进程淘汰L1
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'config.cache.TwoTierCache',
         'LOCATION': f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/{os.getenv('REDIS_DB', '1')}",
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-            'CONNECTION_POOL_KWARGS': {'max_connections': 50}
+            'CONNECTION_POOL_KWARGS': {'max_connections': 50},
+            # Redis故障时尽快失败并退化为只使用L1
+            'SOCKET_CONNECT_TIMEOUT': 1,
+            'SOCKET_TIMEOUT': 1,
+            'L1_MAX_ENTRIES': int(os.getenv('CACHE_L1_MAX_ENTRIES', '2000')),
+            'L1_TIMEOUT': int(os.getenv('CACHE_L1_TIMEOUT', '60')),
+            'L2_RETRY_INTERVAL': 5,
         }
     }
 }
 
+# AI服务HTTP连接池(每个 worker 进程按服务地址各一个连接池)
+AI_HTTP_POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', '10'))
+AI_HTTP_MAX_HOSTS = int(os.getenv('AI_HTTP_MAX_HOSTS', '32'))
+# 异步视图(ASGI)中每个服务地址的最大并发连接数
+AI_HTTP_ASYNC_MAX_CONNECTIONS = int(os.getenv('AI_HTTP_ASYNC_MAX_CONNECTIONS', '200'))
+AI_HTTP_CONNECT_TIMEOUT = float(os.getenv('AI_HTTP_CONNECT_TIMEOUT', '5'))
+AI_HTTP_READ_TIMEOUT = float(os.getenv('AI_HTTP_READ_TIMEOUT', '60'))
+AI_HTTP_STREAM_READ_TIMEOUT = float(os.getenv('AI_HTTP_STREAM_READ_TIMEOUT', '120'))
+AI_HTTP_RETRIES = int(os.getenv('AI_HTTP_RETRIES', '2'))
+AI_HTTP_BACKOFF = float(os.getenv('AI_HTTP_BACKOFF', '0.5'))
+# AI对话每轮发送的上下文(历史消息+摘要)的 token 上限, 实际预算还受模型上下文长度限制
+AI_CONTEXT_MAX_TOKENS = int(os.getenv('AI_CONTEXT_MAX_TOKENS', '3000'))
+
 # Celery配置
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
@@ -186,6 +217,13 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    # 浏览/点赞计数先缓冲在 Redis, 定时批量写回数据库
+    'flush-counters': {
+        'task': 'apps.courses.tasks.flush_counters',
+        'schedule': float(os.getenv('COUNTER_FLUSH_INTERVAL', '30')),
+    },
+}
 
 # 日志配置
 import os
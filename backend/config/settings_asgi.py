@@ -0,0 +1,14 @@
+"""
+Django settings for the ASGI process (调用AI服务的异步接口, 见 apps/courses/async_views.py)
+中间件链中只要有一个只支持同步的中间件, Django 就会把整条链放进线程执行, 每个进行中的请求占用一个线程;
+这里去掉只支持同步的中间件: 静态文件由 nginx 提供, 不需要 WhiteNoise, 调试工具栏只在 WSGI 进程中使用
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import MIDDLEWARE
+
+SYNC_ONLY_MIDDLEWARE = (
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+)
+
+MIDDLEWARE = [path for path in MIDDLEWARE if path not in SYNC_ONLY_MIDDLEWARE]
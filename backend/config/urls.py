@@ -1,11 +1,13 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from apps.courses.views import course_resource
+
 # API文档配置
 schema_view = get_schema_view(
     openapi.Info(
@@ -32,20 +34,19 @@ urlpatterns = [
     path('api/exercises/', include('apps.exercises.urls')),
     path('api/community/', include('apps.community.urls')),
     path('api/analytics/', include('apps.analytics.urls')),
+    
+    # 课程资源文件(生产环境中带哈希的URL由nginx直接提供, 其余通过X-Accel-Redirect发送)
+    re_path(r'^%s(?P<path>.+)$' % settings.COURSE_RESOURCES_URL.lstrip('/'), course_resource, name='course-resource'),
 ]
 
 # 开发环境配置
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    # 课程资源文件
-    urlpatterns += static(settings.COURSE_RESOURCES_URL, document_root=settings.COURSE_RESOURCES_ROOT)
+    urlpatterns += static(settings.COURSE_DERIVATIVES_URL, document_root=settings.COURSE_DERIVATIVES_ROOT)
     
     # Debug Toolbar
     import debug_toolbar
     urlpatterns = [
         path('__debug__/', include(debug_toolbar.urls)),
     ] + urlpatterns
-else:
-    # 生产环境也需要提供课程资源
-    urlpatterns += static(settings.COURSE_RESOURCES_URL, document_root=settings.COURSE_RESOURCES_ROOT)
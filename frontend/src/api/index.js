@@ -1,6 +1,11 @@
 import request from '@/utils/request'
 
 export const courseApi = {
+  // 获取课程目录(分类 -> 课程 -> 课时摘要)
+  getCatalog() {
+    return request.get('/courses/catalog/')
+  },
+  
   // 获取课程分类
   getCategories() {
     return request.get('/courses/categories/')
@@ -27,14 +32,29 @@ export const courseApi = {
   },
   
   // 获取课时详情
-  getLessonDetail(slug) {
-    return request.get(`/courses/lessons/${slug}/`)
+  getLessonDetail(slug, params) {
+    return request.get(`/courses/lessons/${slug}/`, { params })
+  },
+  
+  // 获取课时的一个章节(懒加载)
+  getLessonSection(slug, anchor) {
+    return request.get(`/courses/lessons/${slug}/sections/${encodeURIComponent(anchor)}/`)
   },
   
   // 点赞课时
   likeLesson(slug) {
     return request.post(`/courses/lessons/${slug}/like/`)
   },
+  
+  // 全文搜索课时内容
+  search(q, params = {}) {
+    return request.get('/courses/search/', { params: { q, ...params } })
+  },
+  
+  // 标题自动补全
+  suggest(q, limit = 10) {
+    return request.get('/courses/suggest/', { params: { q, limit } })
+  },
 }
 
 export const progressApi = {
@@ -53,6 +73,11 @@ export const progressApi = {
     return request.post('/courses/progress/', data)
   },
   
+  // 批量提交学习进度心跳
+  heartbeat(events) {
+    return request.post('/courses/progress/heartbeat/', { events })
+  },
+  
   // 获取学习统计
   getStatistics() {
     return request.get('/courses/progress/statistics/')
@@ -0,0 +1,33 @@
+import { progressApi } from '@/api'
+
+// 学习进度心跳: 事件先放入队列, 每分钟(或离开页面时)合并成一次请求提交
+const FLUSH_INTERVAL = 60 * 1000
+const MAX_EVENTS = 500
+
+let queue = []
+let timer = null
+
+export function reportProgress(event) {
+  queue.push({ ...event, timestamp: new Date().toISOString() })
+  if (queue.length >= MAX_EVENTS) {
+    flushProgress()
+  } else if (!timer) {
+    timer = setTimeout(flushProgress, FLUSH_INTERVAL)
+  }
+}
+
+export async function flushProgress() {
+  clearTimeout(timer)
+  timer = null
+  if (!queue.length) {
+    return
+  }
+  const events = queue
+  queue = []
+  try {
+    await progressApi.heartbeat(events)
+  } catch (error) {
+    // 提交失败时放回队列, 下次一起提交
+    queue = events.concat(queue).slice(-MAX_EVENTS)
+  }
+}
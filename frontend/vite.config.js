@@ -21,6 +21,10 @@ export default defineConfig({
         target: 'http://backend:8020',  // 课程资源文件代理到后端
         changeOrigin: true,
       },
+      '/course-derived': {
+        target: 'http://backend:8020',  // 课程图片衍生文件代理到后端
+        changeOrigin: true,
+      },
     },
   },
 })